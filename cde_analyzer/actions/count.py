@@ -1,14 +1,30 @@
+import re
+import sys
+import yaml  # pip install pyyaml
 import argparse
-import json
 import logging
-from logic.counter import count_matching_fields
-from utils.output_writer import phrase_write_output
+from pathlib import Path
+from typing import List
+from logic.counter import (
+    CountQuery,
+    compile_logic,
+    count_queries,
+    count_queries_columnar,
+    count_queries_sharded,
+)
+from logic.count_state import CountState
+from logic.columnar import is_parquet_path, read_columnar
+from utils.output_writer import open_output, phrase_write_output, write_jsonl
+from utils.compression import open_file, strip_compression_suffix
+from utils.cde_impexport import add_workers_argument, iter_json, models_from_args
 from utils.helpers import (
     safe_nested_increment,
     flatten_nested_dict,
+    iter_count_records,
     export_results_csv,
     export_results_tsv,
 )
+from utils import json_backend
 from argparse import ArgumentParser
 from CDE_Schema import CDEItem
 
@@ -18,12 +34,35 @@ description_text = "Count pydantic model fields that satisify certain conditions
 logger = logging.getLogger(__name__)
 
 
+MATCH_TYPES = ["non_null", "null", "fixed", "regex"]
+GROUP_TYPES = ["top", "path", "terminal"]
+
+
+def logic_expression(expr: str) -> str:
+    """argparse type: reject a --logic expression that doesn't compile."""
+    try:
+        compile_logic(expr)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return expr
+
+
 def register_subparser(subparser: ArgumentParser):
-    subparser.add_argument("--input", help="Input JSON file.")
-    subparser.add_argument("--fields", nargs="+", required=True)
+    subparser.add_argument(
+        "--input",
+        help="Input JSON or JSON Lines file ('-' for stdin), or a .parquet table from "
+        "export_columnar, which is counted with the vectorized backend.",
+    )
+    fields = subparser.add_mutually_exclusive_group(required=True)
+    fields.add_argument("--fields", nargs="+")
+    fields.add_argument(
+        "--queries",
+        help="YAML list of named count specs evaluated in one pass (see load_queries); "
+        "--output is then a directory receiving one <name>.<format> file per query",
+    )
     subparser.add_argument(
         "--match-type",
-        choices=["non_null", "null", "fixed", "regex"],
+        choices=MATCH_TYPES,
         default="non_null",
         help="Type of match, null type is empty string or list, or None.",
     )
@@ -32,7 +71,7 @@ def register_subparser(subparser: ArgumentParser):
     )
     subparser.add_argument(
         "--output-format",
-        choices=["json", "csv", "tsv"],
+        choices=["json", "jsonl", "csv", "tsv"],
         default="json",
         help="Output format.",
     )
@@ -45,11 +84,15 @@ def register_subparser(subparser: ArgumentParser):
     )
     subparser.add_argument(
         "--group-type",
-        choices=["top", "path", "terminal"],
+        choices=GROUP_TYPES,
         default="top",
         help="Interpret group-by field as a top-level, full-path, or terminal (deepest) component of model",
     )
-    subparser.add_argument("--logic", help="Logical expression (e.g. 'A and not B')")
+    subparser.add_argument(
+        "--logic",
+        type=logic_expression,
+        help="Logical expression over --fields names (e.g. 'A and not B'); and/or/not/parentheses only",
+    )
     subparser.add_argument(
         "--verbose",
         action="store_true",
@@ -71,17 +114,187 @@ def register_subparser(subparser: ArgumentParser):
         action="store_true",
         help="Flatten nested result keys for easier analysis",
     )
+    subparser.add_argument(
+        "--no-prune",
+        dest="prune",
+        action="store_false",
+        help="Walk every field of each item instead of only the schema subtrees that can match --fields",
+    )
+
+    subparser.add_argument(
+        "--incremental",
+        metavar="STATE",
+        help="SQLite file keeping each item's counts by tinyId and content hash; only items "
+        "added, changed or removed since the previous run are counted (created if missing)",
+    )
 
+    add_workers_argument(subparser)
     subparser.set_defaults(func=run_action)
 
 
+QUERY_KEYS = {
+    "fields": "field_names",
+    "match_type": "match_type",
+    "value": "value_match",
+    "logic": "logic_expr",
+    "group_by": "group_by",
+    "group_type": "group_type",
+    "count_type": "count_type",
+    "char_limit": "char_limit",
+}
+QUERY_NAME = re.compile(r"[\w.-]+")
+
+
+def load_queries(path: str, args) -> List[CountQuery]:
+    """
+    Read count specs from YAML: a list of mappings with a `name`, or a mapping
+    from name to spec. Spec keys are the count options (fields, match_type,
+    value, logic, group_by, group_type, count_type, char_limit; `-` or `_`),
+    and options left out fall back to the command line. For example:
+
+        - name: pv_nonnull
+          fields: [permissibleValue, valueMeaningName]
+        - name: pv_types
+          fields: permissibleValue
+          count_type: true
+          char_limit: 2
+    """
+    with open_file(path) as f:
+        specs = yaml.safe_load(f)
+    if isinstance(specs, dict):
+        specs = [dict(spec or {}, name=name) for name, spec in specs.items()]
+    if not isinstance(specs, list) or not specs:
+        raise ValueError(f"{path}: expected a list of count specs")
+
+    queries, names = [], set()
+    for n, spec in enumerate(specs, 1):
+        spec = {str(k).replace("-", "_"): v for k, v in (spec or {}).items()}
+        name = str(spec.pop("name", f"query{n}"))
+        unknown = set(spec) - set(QUERY_KEYS)
+        if unknown:
+            raise ValueError(f"{path}: query {name!r} has unknown keys {sorted(unknown)}")
+        # names become output file names under --outdir
+        if not QUERY_NAME.fullmatch(name) or name in {".", ".."}:
+            raise ValueError(
+                f"{path}: query name {name!r} may only use letters, digits, '_', '-' and '.'"
+            )
+        if name in names:
+            raise ValueError(f"{path}: duplicate query name {name!r}")
+        if not spec.get("fields"):
+            raise ValueError(f"{path}: query {name!r} needs fields")
+        names.add(name)
+
+        options = {
+            "match_type": args.match_type,
+            "value_match": args.value,
+            "logic_expr": args.logic,
+            "group_by": args.group_by,
+            "group_type": args.group_type,
+            "count_type": args.count_type,
+            "char_limit": args.char_limit,
+        }
+        options.update((QUERY_KEYS[k], v) for k, v in spec.items())
+        if options["match_type"] is None:  # YAML reads `match_type: null` as None
+            options["match_type"] = "null"
+        if isinstance(options["field_names"], str):
+            options["field_names"] = [options["field_names"]]
+        if options["match_type"] not in MATCH_TYPES:
+            raise ValueError(f"{path}: query {name!r} has unknown match_type {options['match_type']!r}")
+        if options["group_type"] not in GROUP_TYPES:
+            raise ValueError(f"{path}: query {name!r} has unknown group_type {options['group_type']!r}")
+        queries.append(CountQuery(name=name, verbose=args.verbose, **options))
+    return queries
+
+
+def write_results(results, output_path, args, group_by, count_type):
+    output_flat = args.output_flat
+
+    if args.output_format == "jsonl":
+        levels = ["field", "datatype", "group"] if count_type else ["field", "group"]
+        write_jsonl(iter_count_records(results, levels), output_path)
+        return
+
+    if output_path:
+        if output_flat:
+            flattened = flatten_nested_dict(results)
+            with open_output(output_path) as f:
+                json_backend.dump(flattened, f, indent=2)
+        elif strip_compression_suffix(output_path).endswith(".csv"):
+            export_results_csv(results, output_path, group_by or "group")
+        elif strip_compression_suffix(output_path).endswith(".tsv"):
+            export_results_tsv(results, output_path, group_by or "group")
+        else:
+            with open_output(output_path) as f:
+                json_backend.dump(results, f, indent=2)
+
+    phrase_write_output(results, format=args.output_format, out_path=output_path)
+
+
+def run_counts(args, queries: List[CountQuery]):
+    """
+    Count from the JSON items, or from an export_columnar Parquet table. With
+    --workers N, shards of the raw items are validated and counted in N
+    processes and the partial counts merged. With --incremental, only the
+    items changed since the last run are counted.
+    """
+    if is_parquet_path(args.input):
+        if args.incremental:
+            sys.exit("count: --incremental needs JSON input, not a Parquet table")
+        try:
+            return count_queries_columnar(read_columnar(args.input), queries, CDEItem)
+        except ValueError as e:
+            sys.exit(f"count: {e}")
+    if args.incremental:
+        with CountState(args.incremental, queries, CDEItem) as state:
+            state.update(iter_json(args.input))
+        return [q.results for q in queries]
+    if args.workers > 1:
+        return count_queries_sharded(
+            iter_json(args.input), CDEItem, queries, args.workers, prune=args.prune
+        )
+    return count_queries(models_from_args(args, CDEItem), queries, prune=args.prune)
+
+
+def run_queries(args):
+    try:
+        queries = load_queries(args.queries, args)
+    except ValueError as e:
+        sys.exit(f"count: {e}")
+    if not args.output and args.output_format in {"csv", "tsv"}:
+        sys.exit("count: --queries with csv/tsv output needs --output DIR")
+
+    run_counts(args, queries)
+
+    if not args.output:
+        # one document on stdout, keyed (json) or tagged (jsonl) by query name
+        if args.output_format == "jsonl":
+            records = (
+                {"query": q.name, **record}
+                for q in queries
+                for record in iter_count_records(
+                    q.results, ["field", "datatype", "group"] if q.count_type else ["field", "group"]
+                )
+            )
+            write_jsonl(records, None)
+        else:
+            print(json_backend.dumps({q.name: q.results for q in queries}, indent=2))
+        return
+
+    outdir = Path(args.output)
+    outdir.mkdir(parents=True, exist_ok=True)
+    for q in queries:
+        output_path = str(outdir / f"{q.name}.{args.output_format}")
+        write_results(q.results, output_path, args, q.group_by, q.count_type)
+        logger.info(f"Wrote query {q.name!r} to {output_path}")
+
+
 def run_action(args):
-    raw = json.load(open(args.input))
-    items = [CDEItem.model_validate(obj) for obj in raw]
+    if args.queries:
+        run_queries(args)
+        return
 
-    results = count_matching_fields(
-        items=items,
-        field_names=args.fields,
+    query = CountQuery(
+        args.fields,
         match_type=args.match_type,
         value_match=args.value,
         logic_expr=args.logic,
@@ -91,22 +304,5 @@ def run_action(args):
         count_type=args.count_type,
         char_limit=args.char_limit,
     )
-    # define shorter vars to avoid using arg.* in many places
-    output_path = args.output
-    output_flat = args.output_flat
-    group_by = args.group_by
-
-    if output_path:
-        if output_flat:
-            flattened = flatten_nested_dict(results)
-            with open(output_path, "w", newline="") as f:
-                json.dump(flattened, f, indent=2)
-        elif output_path.endswith(".csv"):
-            export_results_csv(results, output_path, group_by or "group")
-        elif output_path.endswith(".tsv"):
-            export_results_tsv(results, output_path, group_by or "group")
-        else:
-            with open(output_path, "w", newline="") as f:
-                json.dump(results, f, indent=2)
-
-    phrase_write_output(results, format=args.output_format, out_path=args.output)
+    results = run_counts(args, [query])[0]
+    write_results(results, args.output, args, args.group_by, args.count_type)
@@ -0,0 +1,66 @@
+#
+# File: actions/export_columnar.py
+#
+from argparse import ArgumentParser, Namespace
+from typing import Type
+from pydantic import BaseModel
+from logic.columnar import DEFAULT_BATCH_ROWS, item_leaves, number_leaf_rows, write_leaf_rows
+from utils.cde_impexport import add_workers_argument, map_models
+from utils.logger import logging
+from CDE_Schema import CDEItem, CDEForm  # type: ignore
+
+MODEL_REGISTRY: dict[str, Type[BaseModel]] = {
+    "CDE": CDEItem,
+    "Form": CDEForm,
+}
+
+logger = logging.getLogger(__name__)
+
+help_text = "Flatten items into a long-format Parquet table of leaf values"
+description_text = (
+    "Write one row per leaf value (item, tinyId, path, list indices, value, type), "
+    "using the same dotted/`*` paths as count, to a Parquet file for vectorized analysis. "
+    "Requires pyarrow."
+)
+
+
+def register_subparser(subparser: ArgumentParser):
+    subparser.add_argument(
+        "--input", help="Input JSON or JSON Lines file ('-' for stdin)."
+    )
+    subparser.add_argument(
+        "--model",
+        "-m",
+        default="CDE",
+        choices=MODEL_REGISTRY.keys(),
+        help="Model to use for validation (default: CDE).",
+    )
+    subparser.add_argument(
+        "--output", required=True, help="Parquet file to write."
+    )
+    subparser.add_argument(
+        "--batch-rows",
+        type=int,
+        default=DEFAULT_BATCH_ROWS,
+        help=f"Rows per Parquet row group (default: {DEFAULT_BATCH_ROWS}).",
+    )
+    subparser.add_argument(
+        "--compression",
+        choices=["zstd", "snappy", "gzip", "none"],
+        default="zstd",
+        help="Parquet column compression (default: zstd).",
+    )
+    add_workers_argument(subparser)
+    subparser.set_defaults(func=run_action)
+
+
+def run_action(args: Namespace):
+    # Leaves are collected where the items are validated; only numbering the
+    # items and writing the row groups happen in this process.
+    per_item = map_models(args.input, MODEL_REGISTRY[args.model], item_leaves, args.workers)
+    write_leaf_rows(
+        number_leaf_rows(per_item),
+        args.output,
+        batch_rows=args.batch_rows,
+        compression=None if args.compression == "none" else args.compression,
+    )
@@ -6,12 +6,15 @@ import json
 import pydantic
 import sys
 import logging
+from functools import partial
 from typing import TypeVar
 from pydantic import BaseModel
 from CDE_Schema import CDEItem, CDEForm
 from utils.helpers import extract_embed_project_fields_by_tinyid
 from utils.tinyid_utils import load_tinyids
-from logic.extract_embed import extract_path
+from utils.cde_impexport import add_workers_argument, map_models, as_models
+from logic.extract_embed import extract_rows, write_rows
+from utils.extract_embed import strip_json
 from argparse import ArgumentParser, ArgumentError, BooleanOptionalAction
 
 # from actions.count import run_action
@@ -29,8 +32,11 @@ description_text = "Extract a desired subset of fields and collapse repeated key
 models_str = ", ".join(MODEL_REGISTRY.keys())
 
 
-def register_subparser(subparser: ArgumentParser):
-    subparser.add_argument("--input", help="Input JSON file.")
+def register_subparser(subparser: ArgumentParser, stage: bool = False):
+    # input/output are optional already, so a pipeline `stage` registers the same options
+    subparser.add_argument(
+        "--input", help="Input JSON or JSON Lines file ('-' for stdin)."
+    )
     ids = subparser.add_mutually_exclusive_group()
     ids.add_argument(
         "--id-list",
@@ -45,7 +51,7 @@ def register_subparser(subparser: ArgumentParser):
     )
     subparser.add_argument(
         "--output-format",
-        choices=["json", "csv", "tsv"],
+        choices=["json", "jsonl", "csv", "tsv"],
         default="json",
         help="Choose output format. (default JSON)",
     )
@@ -91,10 +97,11 @@ def register_subparser(subparser: ArgumentParser):
         default=True,
         help="Process limited set of permissibleValues fields using heuristic.",
     )
+    add_workers_argument(subparser)
     subparser.set_defaults(func=run_action)
 
 
-def run_action(args):
+def resolve_idlist(args):
     if (args.id_list or args.id_file) and args.id_type is None:
         print(
             "error:--id_type is required when --id-list or --id-file is used.",
@@ -111,22 +118,49 @@ def run_action(args):
 
     # paths = load_path_schema(args.path_file)
     if args.id_file:
-        idlist = load_tinyids(args.id_file)
-    else:
-        idlist = args.id_list
+        return load_tinyids(args.id_file)
+    return args.id_list
 
-    raw = json.load(open(args.input))
-    # ModelType = TypeVar(MODEL_REGISTRY[args.model], bound=BaseModel)
+
+def make_stage(args):
+    """Pipeline stage: extract one (whitespace-cleaned) row per streamed item."""
     model_class = MODEL_REGISTRY[args.model]
+    idlist = resolve_idlist(args)
+
+    def stage(items):
+        rows = extract_rows(
+            model_class,
+            as_models(items, model_class),
+            idlist,
+            args.path_file,
+            args.exclude,
+            args.collapse,
+            args.simplify_permissible,
+        )
+        return (strip_json(row) for row in rows)
 
-    extract_path(
+    return stage
+
+
+def run_action(args):
+    idlist = resolve_idlist(args)
+
+    # ModelType = TypeVar(MODEL_REGISTRY[args.model], bound=BaseModel)
+    model_class = MODEL_REGISTRY[args.model]
+    # Rows are extracted where the items are validated, so with --workers
+    # only the rows, not the models, come back from the pool.
+    rows = map_models(
+        args.input,
         model_class,
-        raw,
-        idlist,
-        args.output,
-        args.output_format,
-        args.path_file,
-        args.exclude,
-        args.collapse,
-        args.simplify_permissible,
+        partial(
+            extract_rows,
+            model_class,
+            tinyids=idlist,
+            schema_path=args.path_file,
+            exclude=args.exclude,
+            collapse=args.collapse,
+            simplify=args.simplify_permissible,
+        ),
+        args.workers,
     )
+    write_rows(rows, args.output, args.output_format)
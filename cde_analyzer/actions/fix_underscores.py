@@ -1,10 +1,13 @@
 # actions/fix_underscores.py
 
-import json
 import logging
 import argparse
 import textwrap
+from itertools import chain, islice
 from argparse import ArgumentParser, BooleanOptionalAction, Namespace
+from utils.cde_impexport import iter_json, is_json_array, as_dicts
+from utils.output_writer import infer_item_format, is_stdout, open_output, write_items
+from utils import json_backend
 
 logger = logging.getLogger(__name__)
 
@@ -12,12 +15,20 @@ help_text = "Prepend a character to JSON keys starting with an underscore."
 description_text = "Pydantic reserves keys beginning with an underscore as private. Convert to start with another character."
 
 
-def register_subparser(subparser: ArgumentParser):
+def register_subparser(subparser: ArgumentParser, stage: bool = False):
+    # input/output are optional already, so a pipeline `stage` registers the same options
     subparser.add_argument(
-        "--input", help="Full path, including name, of input JSON file."
+        "--input",
+        help="Full path, including name, of input JSON or JSON Lines file ('-' for stdin).",
     )
     subparser.add_argument(
-        "--output", help="Full path, including name, of output JSON file."
+        "--output",
+        help="Full path, including name, of output JSON file (default: stdout).",
+    )
+    subparser.add_argument(
+        "--output-format",
+        choices=["json", "jsonl"],
+        help="Output a JSON array or JSON Lines (default: from --output extension, else json).",
     )
     subparser.add_argument(
         "--prefix",
@@ -52,17 +63,34 @@ def fix_keys(data, prefix, max_depth=None, current_depth=0):
         return data
 
 
+def make_stage(args: Namespace):
+    """Pipeline stage: fix underscore-prefixed keys of each streamed item."""
+
+    def stage(items):
+        return (fix_keys(item, args.prefix, args.depth) for item in as_dicts(items))
+
+    return stage
+
+
 def run_action(args: Namespace):
+    # Items of the top-level array are streamed and fixed independently;
+    # list elements keep their parent's depth, so this matches fixing the
+    # whole document at once.
     logger.info(f"Reading input JSON from {args.input}")
-    with open(args.input, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
     logger.info(f"Fixing underscore-prefixed keys with prefix '{args.prefix}'")
-    fixed = fix_keys(data, args.prefix, args.depth)
+    fixed = (fix_keys(item, args.prefix, args.depth) for item in iter_json(args.input))
 
     if args.output:
         logger.info(f"Writing output to {args.output}")
-        with open(args.output, "w", encoding="utf-8", newline="") as f:
-            json.dump(fixed, f, indent=2)
-    else:
-        print(json.dumps(fixed, indent=2))
+    if infer_item_format(args.output_format, args.output) == "json" and not is_json_array(args.input):
+        # A lone top-level object is written back as an object, not wrapped
+        # in an array; a stream of several values still becomes an array.
+        head = list(islice(fixed, 2))
+        if len(head) == 1:
+            with open_output(args.output) as f:
+                json_backend.dump(head[0], f, indent=2)
+                if is_stdout(args.output):
+                    f.write("\n")
+            return
+        fixed = chain(head, fixed)
+    write_items(fixed, args.output, args.output_format)
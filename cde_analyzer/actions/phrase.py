@@ -2,8 +2,19 @@ import json
 import logging
 import argparse
 from argparse import ArgumentParser, BooleanOptionalAction, Namespace
-from logic.phrase_extractor import collect_all_phrase_occurrences
+from logic.phrase_extractor import (
+    DEFAULT_TAG_BATCH_SIZE,
+    collect_all_phrase_occurrences,
+    collect_all_phrase_occurrences_sharded,
+)
 from utils.output_writer import phrase_write_output
+from utils.phrase_extraction import (
+    DEFAULT_WORD_CACHE_SIZE,
+    load_word_caches,
+    save_word_caches,
+    set_word_cache_size,
+)
+from utils.cde_impexport import add_workers_argument, iter_json, models_from_args
 from utils.analyzer_state import get_verbosity, set_verbosity
 
 # from pydantic import parse_file_as
@@ -17,7 +28,9 @@ logger = logging.getLogger(__name__)
 
 
 def register_subparser(subparser: ArgumentParser):
-    subparser.add_argument("--input", "-i", help="Input JSON file")
+    subparser.add_argument(
+        "--input", "-i", help="Input JSON or JSON Lines file ('-' for stdin)"
+    )
     subparser.add_argument(
         "--fields",
         "-f",
@@ -31,6 +44,11 @@ def register_subparser(subparser: ArgumentParser):
         default=2,
         help="Minimum length of phrases, i.e., discard shorter phrases",
     )
+    subparser.add_argument(
+        "--max-words",
+        type=int,
+        help="Maximum length of phrases, i.e., don't collect longer phrases (default: no limit)",
+    )
     subparser.add_argument(
         "--min-ids",
         type=int,
@@ -73,7 +91,7 @@ def register_subparser(subparser: ArgumentParser):
     )
     subparser.add_argument(
         "--output-format",
-        choices=["json", "csv", "tsv"],
+        choices=["json", "jsonl", "csv", "tsv"],
         default="json",
         help="Choose output format",
     )
@@ -85,26 +103,62 @@ def register_subparser(subparser: ArgumentParser):
         action="store_true",
         help="Include verbatim (non-lemmatized) phrases alongside lemma phrases",
     )
+    subparser.add_argument(
+        "--tag-batch-size",
+        type=int,
+        default=DEFAULT_TAG_BATCH_SIZE,
+        help=f"Field values to tokenize and POS tag per batch (default: {DEFAULT_TAG_BATCH_SIZE}).",
+    )
+    subparser.add_argument(
+        "--word-cache-size",
+        type=int,
+        default=DEFAULT_WORD_CACHE_SIZE,
+        help=f"Texts and (word, POS) lemmas to remember between fields, least recently used dropped first; 0 disables (default: {DEFAULT_WORD_CACHE_SIZE}).",
+    )
+    subparser.add_argument(
+        "--word-cache",
+        help="File to load the text and lemma caches from and save them to, to reuse them across runs.",
+    )
+    add_workers_argument(subparser)
     subparser.set_defaults(func=run_action)
 
 
 def run_action(args: Namespace):
+    """
+    With --workers N, shards of the raw items are validated and their phrases
+    collected in N processes, and the partial phrase maps merged. The workers
+    start from a loaded --word-cache and return what they add to it.
+    """
     verbosity = get_verbosity()
-    raw = json.load(open(args.input))
-    items = [CDEItem.model_validate(obj) for obj in raw]
 
     logger.info(f"arguments: {args}")
+    set_word_cache_size(args.word_cache_size)
+    if args.word_cache:
+        load_word_caches(args.word_cache)
 
-    results = collect_all_phrase_occurrences(
-        items=items,
+    options = dict(
         field_names=args.fields,
         min_words=args.min_words,
+        max_words=args.max_words,
         remove_stopwords=args.remove_stopwords,
         min_ids=args.min_ids,
         verbosity=verbosity,
         prune=args.prune,
         lemmatize=args.lemmatize,
         verbatim=args.verbatim,
+        tag_batch_size=args.tag_batch_size,
     )
+    if args.workers > 1:
+        results = collect_all_phrase_occurrences_sharded(
+            iter_json(args.input),
+            CDEItem,
+            workers=args.workers,
+            word_cache=bool(args.word_cache),
+            **options,
+        )
+    else:
+        results = collect_all_phrase_occurrences(models_from_args(args, CDEItem), **options)
+    if args.word_cache:
+        save_word_caches(args.word_cache)
 
     phrase_write_output(results, format=args.output_format, out_path=args.output)
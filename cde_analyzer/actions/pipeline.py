@@ -0,0 +1,93 @@
+#
+# File: actions/pipeline.py
+#
+import sys
+import shlex
+import logging
+from argparse import ArgumentParser, Namespace
+from typing import Any, Callable, Iterator
+from actions import extract_embed, fix_underscores, strip_html, strip_phrases
+from utils.cde_impexport import iter_json, as_dicts
+from utils.output_writer import write_items
+
+logger = logging.getLogger(__name__)
+
+help_text = "Chain preprocessing actions in one process"
+description_text = (
+    "Run fix_underscores, strip_html, strip_phrases and extract_embed as streaming "
+    "stages. Items are passed between stages in memory (validated models stay "
+    "validated) and only the final output is written."
+)
+
+# Actions that provide make_stage(args) -> stage(items) -> items, and whose
+# register_subparser(parser, stage=True) leaves the pipeline's options optional
+STAGES = {
+    "fix_underscores": fix_underscores,
+    "strip_html": strip_html,
+    "strip_phrases": strip_phrases,
+    "extract_embed": extract_embed,
+}
+
+# Options owned by the pipeline itself rather than its steps; stages run in
+# the pipeline's process, so a step's --workers doesn't apply either
+PIPELINE_DESTS = {"input", "output", "outdir", "output_format", "format", "dry_run", "workers"}
+
+Stage = Callable[[Iterator[Any]], Iterator[Any]]
+
+
+def register_subparser(subparser: ArgumentParser):
+    subparser.add_argument(
+        "--input",
+        "-i",
+        required=True,
+        help="Input JSON or JSON Lines file ('-' for stdin).",
+    )
+    subparser.add_argument(
+        "--output", "-o", help="Final output file (default: stdout)."
+    )
+    subparser.add_argument(
+        "--output-format",
+        choices=["json", "jsonl", "csv", "tsv"],
+        help="Final output format (default: from --output extension, else json). csv/tsv need flat rows, e.g. from extract_embed.",
+    )
+    subparser.add_argument(
+        "--step",
+        "-s",
+        action="append",
+        required=True,
+        metavar='"ACTION [OPTIONS]"',
+        help=f"A stage and its usual options, in order; repeat for each stage. Actions: {', '.join(STAGES)}. "
+        "Input/output and --workers options of a step are ignored.",
+    )
+    subparser.set_defaults(func=run_action)
+
+
+def parse_step(spec: str) -> Stage:
+    """Parse one --step with the action's own subparser and build its stage."""
+    argv = shlex.split(spec)
+    if not argv or argv[0] not in STAGES:
+        print(
+            f"error: unknown pipeline step {spec!r}; choose from {', '.join(STAGES)}",
+            file=sys.stderr,
+        )
+        sys.exit(2)
+    name, module = argv[0], STAGES[argv[0]]
+    parser = ArgumentParser(prog=f"pipeline --step {name}")
+    module.register_subparser(parser, stage=True)
+    args = parser.parse_args(argv[1:])
+    for dest in PIPELINE_DESTS:
+        if getattr(args, dest, None) not in (None, parser.get_default(dest)):
+            logger.warning(f"Ignoring --{dest.replace('_', '-')} of pipeline step {name}")
+    logger.info(f"Pipeline step: {name} {' '.join(argv[1:])}")
+    return module.make_stage(args)
+
+
+def run_action(args: Namespace):
+    stages = [parse_step(spec) for spec in args.step]
+
+    items: Iterator[Any] = iter_json(args.input)
+    for stage in stages:
+        items = stage(items)
+
+    n = write_items(as_dicts(items), args.output, args.output_format)
+    logger.info(f"Pipeline wrote {n} items to {args.output or 'stdout'}")
@@ -5,7 +5,8 @@ import argparse
 from argparse import ArgumentParser, Namespace
 from typing import Any, Type, List, Optional, Dict, Union
 from pathlib import Path
-from logic.html_stripper import process_file
+from logic.html_stripper import process_file, clean_models
+from utils.cde_impexport import add_workers_argument, as_models
 from utils.logger import configure_logging, logging
 from pydantic import BaseModel
 from CDE_Schema import CDEItem, CDEForm  # type: ignore
@@ -22,9 +23,12 @@ help_text = "Clean (strip) embedded HTML from JSON structure"
 description_text = "Clean and normalize string fields containing HTML in structured JSON via Pydantic models"
 
 
-def register_subparser(subparser: ArgumentParser):
+def register_subparser(subparser: ArgumentParser, stage: bool = False):
+    # input/output are optional already, so a pipeline `stage` registers the same options
     subparser.add_argument(
-        "--input", nargs="+", help="Input JSON file that has underscore tags fixed."
+        "--input",
+        nargs="+",
+        help="Input JSON or JSON Lines file that has underscore tags fixed ('-' for stdin).",
     )
     # subparser.add_argument(
     #     "--output", help="Path, including filename, to store results."
@@ -39,11 +43,11 @@ def register_subparser(subparser: ArgumentParser):
     subparser.add_argument(
         "--outdir",
         default=".",
-        help="Directory for output files (default: current directory)",
+        help="Directory for output files (default: current directory, '-' for stdout)",
     )
     subparser.add_argument(
         "--format",
-        choices=["json", "yaml", "csv"],
+        choices=["json", "jsonl", "yaml", "csv"],
         default="json",
         help="Output format (default: json)",
     )
@@ -82,16 +86,29 @@ def register_subparser(subparser: ArgumentParser):
         default=False,
         help="Use first row of table as column names (default: false). Only relevant if --tables.",
     )
+    add_workers_argument(subparser)
     subparser.set_defaults(func=run_action)
 
 
+def make_stage(args: Namespace):
+    """Pipeline stage: clean embedded HTML from each streamed item."""
+    model_class = MODEL_REGISTRY[args.model]
+
+    def stage(items):
+        return clean_models(
+            as_models(items, model_class), args.set_keys, args.tables, args.colnames
+        )
+
+    return stage
+
+
 def run_action(args: Namespace):
     model_class = MODEL_REGISTRY[args.model]
     outdir = Path(args.outdir)
 
     for filename in args.input:
         filepath = Path(filename)
-        if not filepath.is_file():
+        if filename != "-" and not filepath.is_file():
             logging.warning(f"Skipping: {filename} is not a valid file.")
             continue
         process_file(
@@ -104,4 +121,5 @@ def run_action(args: Namespace):
             args.pretty,
             args.tables,
             args.colnames,
+            args.workers,
         )
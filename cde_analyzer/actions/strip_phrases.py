@@ -1,12 +1,15 @@
 import CDE_Schema
 import argparse
-import json
+from functools import partial
 from argparse import ArgumentParser, Namespace
 from utils.logger import configure_logging, logging
 from pydantic import BaseModel, ValidationError
 from typing import Any, Type, List, Optional, Dict, Union
-from logic.phrase_stripper import load_phrase_map, strip_phrases
+from logic.phrase_stripper import load_phrase_map, strip_phrases, strip_phrases_dumped
 from utils.diff_utils import print_json_diff
+from utils.cde_impexport import add_workers_argument, map_models, models_from_args, as_models
+from utils.output_writer import write_items
+from utils import json_backend
 
 from CDE_Schema import CDEItem, CDEForm
 from actions.count import register_subparser, run_action
@@ -19,13 +22,17 @@ MODEL_REGISTRY: dict[str, Type[BaseModel]] = {
 logger = logging.getLogger(__name__)
 
 
-def register_subparser(subparser: ArgumentParser):
+def register_subparser(subparser: ArgumentParser, stage: bool = False):
+    """With `stage`, input and output belong to the pipeline and aren't required."""
     # parser = subparsers.add_parser(
     #     "strip_phrases",
     #     help="Remove curated phrases from specific paths in a JSON document.",
     # )
     subparser.add_argument(
-        "-i", "--input", required=True, help="Path to input JSON file."
+        "-i",
+        "--input",
+        required=not stage,
+        help="Path to input JSON or JSON Lines file ('-' for stdin).",
     )
     subparser.add_argument(
         "-m",
@@ -41,7 +48,15 @@ def register_subparser(subparser: ArgumentParser):
         help="Path to phrases file (JSON, CSV, or TSV).",
     )
     subparser.add_argument(
-        "-o", "--output", required=True, help="Path to output JSON file."
+        "-o",
+        "--output",
+        required=not stage,
+        help="Path to output JSON file ('-' for stdout).",
+    )
+    subparser.add_argument(
+        "--output-format",
+        choices=["json", "jsonl"],
+        help="Output a JSON array or JSON Lines (default: from --output extension).",
     )
     # This should be moved to post-processing. Inefficient and memory hungry
     subparser.add_argument(
@@ -66,19 +81,46 @@ def register_subparser(subparser: ArgumentParser):
         default=3,
         help="Number of context lines before and after changes.",
     )
+    add_workers_argument(subparser)
     subparser.set_defaults(func=run_action)
 
 
-def run_action(args: Namespace):
+def make_stage(args: Namespace):
+    """Pipeline stage: strip curated phrases from each streamed item."""
     model_class = MODEL_REGISTRY[args.model]
+    phrase_map = load_phrase_map(args.phrases)
+    if args.diff or args.diff_output or args.summary:
+        logger.warning("Diff options are ignored when strip_phrases runs in a pipeline.")
+
+    def stage(items):
+        return strip_phrases(as_models(items, model_class), phrase_map)
+
+    return stage
+
 
-    with open(args.input, encoding="utf-8") as f:
-        data = json.load(f)
+def run_action(args: Namespace):
+    model_class = MODEL_REGISTRY[args.model]
+    phrase_map = load_phrase_map(args.phrases)
+    show_diff = args.diff or args.diff_output or args.summary
 
-    # Parse into model if needed
-    # items = [CDEItem.model_validate(obj) for obj in raw]
+    # Items are validated lazily and written as they are cleaned, in --workers
+    # processes when there are several. The diff needs both complete
+    # documents, so only that mode materializes the lists, in this process.
     try:
-        parsed = [model_class.model_validate(obj) for obj in data]  # or other model
+        if show_diff:
+            if args.workers > 1:
+                logger.info("Diff options strip phrases in a single process.")
+            parsed = list(models_from_args(args, model_class))
+            cleaned = list(strip_phrases(parsed, phrase_map))
+            dumped = (item.model_dump(mode="json") for item in cleaned)
+        else:
+            dumped = map_models(
+                args.input,
+                model_class,
+                partial(strip_phrases_dumped, phrase_map=phrase_map),
+                args.workers,
+            )
+        write_items(dumped, args.output, args.output_format)
     # Some verbose error output. Appropriate for STDERR
     except ValidationError as e:
         for error in e.errors():
@@ -91,18 +133,11 @@ def run_action(args: Namespace):
                 print(f"Context: {error['ctx']}")
             print("-" * 20)
     else:
-        phrase_map = load_phrase_map(args.phrases)
-        cleaned = strip_phrases(parsed, phrase_map)
-
-        with open(args.output, "w", encoding="utf-8", newline="") as f:
-            cleaned_json = [item.model_dump(mode="json") for item in cleaned]
-            f.write(json.dumps(cleaned_json, indent=2))
-
-        if args.diff or args.diff_output or args.summary:
+        if show_diff:
             original_json = [item.model_dump(mode="json") for item in parsed]
             cleaned_json = [item.model_dump(mode="json") for item in cleaned]
-            original_json = json.dumps(original_json, indent=2)
-            cleaned_json = json.dumps(cleaned_json, indent=2)
+            original_json = json_backend.dumps(original_json, indent=2)
+            cleaned_json = json_backend.dumps(cleaned_json, indent=2)
 
             print_json_diff(
                 original=original_json,
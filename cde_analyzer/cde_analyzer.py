@@ -1,35 +1,31 @@
 #! /usr/bin/python3
 import sys
 import argparse
-from actions import (
-    phrase,
-    count,
-    extract_embed,
-    fix_underscores,
-    strip_html,
-    strip_phrases,
-)
+import importlib
+from typing import Optional
 from utils.logger import configure_logging
 from utils.helpers import which_r, get_state, set_state
 from utils.analyzer_state import get_verbosity, set_verbosity
+from utils.json_backend import JSON_BACKENDS, set_json_backend
 
 
+# Action modules, imported only when their subcommand is chosen (or for the
+# command list in --help)
 ACTIONS = {
-    "phrase": phrase,
-    "count": count,
-    "strip_html": strip_html,
-    "extract_embed": extract_embed,
-    "fix_underscores": fix_underscores,
-    "strip_phrases": strip_phrases,
+    "phrase": "actions.phrase",
+    "count": "actions.count",
+    "strip_html": "actions.strip_html",
+    "extract_embed": "actions.extract_embed",
+    "fix_underscores": "actions.fix_underscores",
+    "strip_phrases": "actions.strip_phrases",
+    "pipeline": "actions.pipeline",
+    "export_columnar": "actions.export_columnar",
     #    "depth": depth.run_action,
     #    "quality": quality.run_action,
 }
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Utilities to work with the NLM CDE repository data modeled as pydantic classes"
-    )
+def add_global_arguments(parser: argparse.ArgumentParser):
     parser.add_argument(
         "--verbosity",
         "-v",
@@ -38,10 +34,37 @@ def main():
         help="Increase verbosity level (-vv for debug)",
     )
     parser.add_argument("--logfile", help="Optional log file path")
+    parser.add_argument(
+        "--json-backend",
+        choices=JSON_BACKENDS,
+        default="auto",
+        help="JSON library for reading and writing; auto prefers orjson when installed",
+    )
+
+
+def chosen_action(argv) -> Optional[str]:
+    """The subcommand named in `argv`, if any, found without importing the actions."""
+    pre = argparse.ArgumentParser(add_help=False)
+    add_global_arguments(pre)
+    pre.add_argument("command", nargs="?")
+    try:
+        known, _ = pre.parse_known_args(argv)
+    except SystemExit:  # a bad global option; the full parser reports it
+        return None
+    return known.command if known.command in ACTIONS else None
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Utilities to work with the NLM CDE repository data modeled as pydantic classes"
+    )
+    add_global_arguments(parser)
     subparsers = parser.add_subparsers(dest="command", required=True)
 
-    # Register each action as a subparser
-    for name, module in ACTIONS.items():
+    # Register the chosen action as a subparser, or all of them to list them
+    command = chosen_action(sys.argv[1:])
+    for name in [command] if command else ACTIONS:
+        module = importlib.import_module(ACTIONS[name])
         action_parser = subparsers.add_parser(
             name,
             help=getattr(module, "help_text", ""),
@@ -52,6 +75,7 @@ def main():
     args = parser.parse_args()
     configure_logging(args.verbosity, args.logfile)
     set_verbosity(args.verbosity)
+    set_json_backend(args.json_backend)
 
     if hasattr(args, "func"):
         args.func(args)
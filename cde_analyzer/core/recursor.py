@@ -1,3 +1,9 @@
+from enum import Enum
+from types import UnionType
+from typing import Annotated, Any, Literal, Union, get_args, get_origin
+from pydantic import BaseModel
+
+
 def recursive_descent(item, path, visitor, *, context=None, depth=0):
     if context is None:
         context = {}
@@ -22,3 +28,130 @@ def recursive_descent(item, path, visitor, *, context=None, depth=0):
             )
     else:
         visitor(path, item, context)
+
+
+# ------------------------------
+# Pruned, iterative traversal
+# ------------------------------
+# A prune plan mirrors the model_dump() structure: a dict maps each key (or "*"
+# for list elements) worth entering to the plan for that subtree, and True
+# means "walk everything below". Keys missing from a plan are skipped without
+# building their paths.
+
+WALK_ALL = True
+
+
+def iter_leaves(item, plan=WALK_ALL, path=""):
+    """
+    Yield (path, value) for the leaves of `item` in the same order and with the
+    same paths as recursive_descent, using an explicit stack instead of
+    recursion and descending only into the subtrees allowed by `plan`.
+    """
+    stack = [(item, path, plan)]
+    pop, push = stack.pop, stack.extend
+    while stack:
+        value, path, plan = pop()
+        if isinstance(value, dict):
+            children = []
+            for k, v in value.items():
+                sub = plan if plan is WALK_ALL else plan.get(k)
+                if sub is not None:
+                    children.append((v, f"{path}.{k}" if path else k, sub))
+            push(reversed(children))
+        elif isinstance(value, list):
+            sub = plan if plan is WALK_ALL else plan.get("*")
+            if value and sub is not None:
+                elem_path = f"{path}.*" if path else "*"
+                push((elem, elem_path, sub) for elem in reversed(value))
+        else:
+            yield path, value
+
+
+def iter_indexed_leaves(item, path=""):
+    """
+    Like iter_leaves without a plan, but yield (path, indices, value) where
+    `indices` holds the list position behind each `*` in the path.
+    """
+    stack = [(item, path, ())]
+    pop, push = stack.pop, stack.extend
+    while stack:
+        value, path, indices = pop()
+        if isinstance(value, dict):
+            push(
+                reversed(
+                    [(v, f"{path}.{k}" if path else k, indices) for k, v in value.items()]
+                )
+            )
+        elif isinstance(value, list):
+            elem_path = f"{path}.*" if path else "*"
+            push(
+                (value[i], elem_path, indices + (i,)) for i in range(len(value) - 1, -1, -1)
+            )
+        else:
+            yield path, indices, value
+
+
+def schema_tree(annotation, seen=()):
+    """
+    Possible model_dump() structure of a type: {} for scalars, a dict of child
+    trees for models and lists ("*"), WALK_ALL where keys are open-ended (dicts,
+    Any) or the model is recursive.
+    """
+    origin = get_origin(annotation)
+    if origin is Annotated:
+        return schema_tree(get_args(annotation)[0], seen)
+    if origin is Union or origin is UnionType:
+        tree = {}
+        for arg in get_args(annotation):
+            tree = _merge_trees(tree, schema_tree(arg, seen))
+        return tree
+    if origin in (list, set, frozenset, tuple) or annotation in (list, set, frozenset, tuple):
+        tree = {}
+        for arg in get_args(annotation) or (Any,):
+            if arg is not Ellipsis:
+                tree = _merge_trees(tree, schema_tree(arg, seen))
+        return {"*": tree}
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        if annotation in seen:
+            return WALK_ALL
+        seen = seen + (annotation,)
+        return {
+            name: schema_tree(field.annotation, seen)
+            for name, field in annotation.model_fields.items()
+        }
+    if annotation in (str, int, float, bool, type(None)) or (
+        isinstance(annotation, type) and issubclass(annotation, Enum)
+    ) or origin is Literal:
+        return {}
+    return WALK_ALL  # dict, Any and anything else we can't see into
+
+
+def _merge_trees(a, b):
+    if a is WALK_ALL or b is WALK_ALL:
+        return WALK_ALL
+    merged = dict(a)
+    for k, v in b.items():
+        merged[k] = _merge_trees(merged[k], v) if k in merged else v
+    return merged
+
+
+def _plan_tree(tree, path, keep):
+    if tree is WALK_ALL:
+        return WALK_ALL
+    plan = {}
+    for key, child in tree.items():
+        child_path = f"{path}.{key}" if path else key
+        sub = _plan_tree(child, child_path, keep)
+        if sub is WALK_ALL or sub or keep(child_path):
+            plan[key] = sub
+    return plan
+
+
+def schema_prune_plan(model_class, keep):
+    """
+    Plan for iter_leaves over `model_class.model_dump()` that enters only the
+    subtrees holding at least one path for which `keep(path)` is true.
+    Open-ended parts of the schema (dicts, Any, recursive models) are walked
+    in full.
+    """
+    return _plan_tree(schema_tree(model_class), "", keep)
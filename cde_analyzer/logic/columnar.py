@@ -0,0 +1,160 @@
+# ------------------------------
+# File: logic/columnar.py
+# ------------------------------
+# Long-format ("one row per leaf") tables of CDE/Form items, written as Parquet
+# so analyses can run as vectorized group-bys instead of re-parsing the JSON.
+# Needs pyarrow (pip install pyarrow).
+
+import os
+import logging
+from typing import Any, Iterable, Iterator, List, Tuple, Union
+from pathlib import Path
+from pydantic import BaseModel
+from core.recursor import iter_indexed_leaves
+
+logger = logging.getLogger(__name__)
+
+# Columns, in order:
+#   item     ordinal of the item in the input (tinyId need not be unique or set)
+#   tinyId   the item's tinyId
+#   path     dotted leaf path, `*` for list elements (as in recursive_descent)
+#   indices  list positions behind each `*` in path
+#   value    str(value) of the leaf, null for None
+#   type     Python type of the leaf: null, bool, int, float, str
+COLUMNS = ["item", "tinyId", "path", "indices", "value", "type"]
+
+DEFAULT_BATCH_ROWS = 100_000
+
+_TYPE_NAMES = {type(None): "null", bool: "bool", int: "int", float: "float", str: "str"}
+
+
+def is_parquet_path(path: Union[str, Path, None]) -> bool:
+    return str(path).lower().endswith(".parquet")
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError(
+            "Columnar export needs the pyarrow package (pip install pyarrow)."
+        ) from None
+    return pyarrow, pyarrow.parquet
+
+
+def arrow_schema():
+    pa, _ = require_pyarrow()
+    return pa.schema(
+        [
+            ("item", pa.int64()),
+            ("tinyId", pa.string()),
+            ("path", pa.dictionary(pa.int32(), pa.string())),
+            ("indices", pa.list_(pa.int32())),
+            ("value", pa.string()),
+            ("type", pa.dictionary(pa.int8(), pa.string())),
+        ]
+    )
+
+
+def item_leaves(models: Iterable[BaseModel]) -> Iterator[Tuple[Any, List[tuple]]]:
+    """Yield (tinyId, [(path, indices, value, type), ...]) for each model."""
+    for model in models:
+        data = model.model_dump()
+        leaves = []
+        for path, indices, value in iter_indexed_leaves(data):
+            type_name = _TYPE_NAMES.get(type(value)) or type(value).__name__
+            leaves.append((path, indices, None if value is None else str(value), type_name))
+        yield data.get("tinyId"), leaves
+
+
+def number_leaf_rows(
+    per_item: Iterable[Tuple[Any, List[tuple]]],
+) -> Iterator[Tuple[int, Any, str, Tuple[int, ...], Union[str, None], str]]:
+    """Turn `item_leaves` output into rows, numbering the items in order."""
+    for n, (tiny_id, leaves) in enumerate(per_item):
+        for leaf in leaves:
+            yield (n, tiny_id) + leaf
+
+
+def iter_leaf_rows(
+    models: Iterable[BaseModel],
+) -> Iterator[Tuple[int, Any, str, Tuple[int, ...], Union[str, None], str]]:
+    """Yield one (item, tinyId, path, indices, value, type) row per leaf."""
+    return number_leaf_rows(item_leaves(models))
+
+
+def leaf_value(value: Union[str, None], type_name: str) -> Any:
+    """Rebuild the original leaf value from its `value` and `type` columns."""
+    if type_name == "null":
+        return None
+    if type_name == "bool":
+        return value == "True"
+    if type_name == "int":
+        return int(value)  # type: ignore[arg-type]
+    if type_name == "float":
+        return float(value)  # type: ignore[arg-type]
+    return value
+
+
+def _batch(rows: List[tuple], schema):
+    pa, _ = require_pyarrow()
+    columns = list(zip(*rows))
+    arrays = [
+        pa.array(column, type=field.type)
+        if not pa.types.is_dictionary(field.type)
+        else pa.array(column, type=pa.string()).dictionary_encode().cast(field.type)
+        for column, field in zip(columns, schema)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def export_columnar(
+    models: Iterable[BaseModel],
+    output: Union[str, Path],
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    compression: str = "zstd",
+) -> int:
+    """
+    Stream the leaves of `models` into a Parquet file, `batch_rows` rows per
+    row group. Returns the number of rows written.
+    """
+    return write_leaf_rows(iter_leaf_rows(models), output, batch_rows, compression)
+
+
+def write_leaf_rows(
+    rows: Iterable[tuple],
+    output: Union[str, Path],
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+    compression: str = "zstd",
+) -> int:
+    """Write `iter_leaf_rows` rows to a Parquet file; see `export_columnar`."""
+    _, pq = require_pyarrow()
+    schema = arrow_schema()
+    output = Path(output)
+    # renamed into place once complete, like open_output
+    tmp = output.with_name(f"{output.stem}.{os.getpid()}.tmp{output.suffix}")
+    n = 0
+    batch: List[tuple] = []
+    try:
+        with pq.ParquetWriter(str(tmp), schema, compression=compression) as writer:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= batch_rows:
+                    writer.write_batch(_batch(batch, schema))
+                    n += len(batch)
+                    batch = []
+            if batch:
+                writer.write_batch(_batch(batch, schema))
+                n += len(batch)
+        os.replace(tmp, output)
+    finally:
+        tmp.unlink(missing_ok=True)
+    logger.info(f"Wrote {n} leaf rows to {output}")
+    return n
+
+
+def read_columnar(path: Union[str, Path], columns: Union[List[str], None] = None):
+    """Load a table written by export_columnar as a pyarrow Table."""
+    _, pq = require_pyarrow()
+    return pq.read_table(str(path), columns=columns)
@@ -0,0 +1,178 @@
+# ------------------------------
+# File: logic/count_state.py
+# ------------------------------
+# Persisted state for `count --incremental`: every item's contribution to the
+# counts of each query, keyed by tinyId and a hash of the item's content, and
+# the aggregate counts, in one SQLite file. A refresh against a new release
+# validates and counts only the added or changed items, and updates the
+# aggregate by subtracting the old contributions and adding the new ones.
+
+import json
+import sqlite3
+import hashlib
+import logging
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple, Type, Union
+from pydantic import BaseModel
+from logic.counter import CountQuery, NestedDict, count_queries
+from utils.cde_impexport import schema_fingerprint
+from utils.helpers import merge_nested_counts
+
+logger = logging.getLogger(__name__)
+
+STATE_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS items (
+    tiny_id TEXT NOT NULL,
+    occurrence INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    counts TEXT NOT NULL,
+    PRIMARY KEY (tiny_id, occurrence)
+);
+"""
+
+ItemKey = Tuple[str, int]
+
+
+def item_digest(obj: Any) -> str:
+    """Hash of an item's content, independent of key order and JSON backend."""
+    canonical = json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+def state_fingerprint(queries: List[CountQuery], model_class: Type[BaseModel]) -> str:
+    """What the stored counts depend on besides the items: the specs and the schema."""
+    specs = [{k: v for k, v in q.spec.items() if k != "verbose"} for q in queries]
+    payload = json.dumps([STATE_VERSION, schema_fingerprint(model_class), specs], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class CountState:
+    """
+    The SQLite count state for one set of queries. Items are keyed by
+    (tinyId, occurrence), the occurrence telling apart repeated tinyIds in
+    input order; an item without a tinyId has tinyId "".
+
+    State built for different queries or another schema is discarded and
+    rebuilt. The updated counts equal a full recount; keys added by a refresh
+    come after the existing ones rather than in input order.
+    """
+
+    def __init__(self, path: Union[str, Path], queries: List[CountQuery], model_class: Type[BaseModel]):
+        self.path = str(path)
+        self.queries = queries
+        self.model_class = model_class
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _meta(self, key: str) -> Union[str, None]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _stored_counts(self, key: ItemKey) -> List[NestedDict]:
+        row = self.conn.execute(
+            "SELECT counts FROM items WHERE tiny_id = ? AND occurrence = ?", key
+        ).fetchone()
+        return json.loads(row[0])
+
+    def update(self, raw_items: Iterable[Any]) -> Dict[str, int]:
+        """
+        Bring the state up to date with `raw_items` (the input's JSON items),
+        set each query's `results` to the aggregate counts and return the
+        number of added, changed, removed and unchanged items.
+        """
+        fingerprint = state_fingerprint(self.queries, self.model_class)
+        n = len(self.queries)
+        stats = {"added": 0, "changed": 0, "removed": 0, "unchanged": 0}
+        with self.conn:
+            if self._meta("fingerprint") != fingerprint:
+                if self._meta("fingerprint") is not None:
+                    logger.warning(
+                        f"Count state {self.path} was built for other queries or schema; rebuilding"
+                    )
+                self.conn.execute("DELETE FROM items")
+                aggregate: List[NestedDict] = [{} for _ in range(n)]
+            else:
+                aggregate = json.loads(self._meta("aggregate") or "null") or [{} for _ in range(n)]
+            known: Dict[ItemKey, str] = {
+                (tiny_id, occurrence): digest
+                for tiny_id, occurrence, digest in self.conn.execute(
+                    "SELECT tiny_id, occurrence, digest FROM items"
+                )
+            }
+
+            def subtract(counts: List[NestedDict]):
+                for total, item_counts in zip(aggregate, counts):
+                    merge_nested_counts(total, item_counts, sign=-1)
+
+            # (key, digest) of the items being counted, in the order
+            # count_queries reaches them
+            counting: deque = deque()
+            rows: List[tuple] = []
+            seen = set()
+            occurrences: Dict[str, int] = defaultdict(int)
+
+            def changed_models():
+                for obj in raw_items:
+                    tiny_id = obj.get("tinyId") if isinstance(obj, dict) else None
+                    tiny_id = "" if tiny_id is None else str(tiny_id)
+                    key = (tiny_id, occurrences[tiny_id])
+                    occurrences[tiny_id] += 1
+                    seen.add(key)
+                    digest = item_digest(obj)
+                    old = known.get(key)
+                    if old == digest:
+                        stats["unchanged"] += 1
+                        continue
+                    if old is None:
+                        stats["added"] += 1
+                    else:
+                        stats["changed"] += 1
+                        subtract(self._stored_counts(key))
+                    counting.append((key, digest))
+                    yield self.model_class.model_validate(obj)
+
+            def item_counted():
+                key, digest = counting.popleft()
+                counts = [q.results for q in self.queries]
+                for total, item_counts in zip(aggregate, counts):
+                    merge_nested_counts(total, item_counts)
+                rows.append((*key, digest, json.dumps(counts)))
+                for q in self.queries:
+                    q.results = {}
+
+            for q in self.queries:
+                q.results = {}
+            count_queries(changed_models(), self.queries, on_item=item_counted)
+
+            for key in known.keys() - seen:
+                stats["removed"] += 1
+                subtract(self._stored_counts(key))
+            self.conn.executemany(
+                "DELETE FROM items WHERE tiny_id = ? AND occurrence = ?", list(known.keys() - seen)
+            )
+            self.conn.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?)", rows)
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                [("fingerprint", fingerprint), ("aggregate", json.dumps(aggregate))],
+            )
+
+        for q, results in zip(self.queries, aggregate):
+            q.results = results
+        logger.info(
+            "Count state {}: {added} added, {changed} changed, {removed} removed, "
+            "{unchanged} unchanged".format(self.path, **stats)
+        )
+        return stats
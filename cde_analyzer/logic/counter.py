@@ -1,13 +1,18 @@
 import re
+import ast
 import json
 import logging
 from collections import defaultdict
-from core.recursor import recursive_descent
-from typing import TypeAlias, Union, Dict, List
+from functools import partial
+from core.recursor import WALK_ALL, iter_leaves, recursive_descent, schema_prune_plan, schema_tree
+from typing import Callable, TypeAlias, Union, Dict, List
 from utils.datatype_check import check_number_type, is_string_shorter
 from utils.helpers import (
+    merge_nested_counts,
     safe_nested_increment,
 )
+from utils.parallel import imap_chunks
+from logic.columnar import leaf_value, require_pyarrow
 
 IntDict: TypeAlias = Dict[str, int]
 NestedDict: TypeAlias = Dict[str, Union[IntDict, "NestedDict"]]
@@ -15,6 +20,86 @@ NestedDict: TypeAlias = Dict[str, Union[IntDict, "NestedDict"]]
 logger = logging.getLogger("cde_analyzer.count")
 
 
+class FieldMatcher:
+    """
+    The `--fields` specs compiled once: a set for exact paths and basenames and
+    a single regex for the wildcard specs. Results are memoized per path; items
+    share a small set of distinct paths, so matching a leaf is a dict lookup.
+    """
+
+    _MISS = object()
+
+    def __init__(self, field_names: List[str]):
+        self.names = set(field_names)
+        wildcards = [fn.replace("*", ".*") for fn in field_names if "*" in fn]
+        self.wildcard = (
+            re.compile("|".join(f"(?:{w})" for w in wildcards)) if wildcards else None
+        )
+        self._memo: Dict[str, Union[str, None]] = {}
+
+    def key(self, path: str) -> Union[str, None]:
+        """Counting key for `path` (the spec'd path or its basename), None if unmatched."""
+        key = self._memo.get(path, self._MISS)
+        if key is not self._MISS:
+            return key  # type: ignore
+        base_name = path.split(".")[-1]
+        if path in self.names:
+            key = path
+        elif base_name in self.names or (
+            self.wildcard is not None and self.wildcard.fullmatch(path)
+        ):
+            key = base_name
+        else:
+            key = None
+        self._memo[path] = key
+        return key
+
+
+LogicFn: TypeAlias = Callable[[Dict[str, int]], bool]
+
+
+def compile_logic(expr: str) -> LogicFn:
+    """
+    Compile a `--logic` expression such as `A and not (B or C)` into a function
+    of an item's per-field counts. Only and/or/not, parentheses and field
+    names (dotted paths allowed) are accepted; anything else raises
+    ValueError, so the expression is never executed as Python. A field with
+    no matches in an item is false.
+    """
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid logic expression {expr!r}: {e.msg}") from None
+    return _compile_logic_node(tree.body, expr)
+
+
+def _dotted_name(node) -> Union[str, None]:
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        prefix = _dotted_name(node.value)
+        return f"{prefix}.{node.attr}" if prefix else None
+    return None
+
+
+def _compile_logic_node(node, expr: str) -> LogicFn:
+    if isinstance(node, ast.BoolOp):
+        parts = [_compile_logic_node(v, expr) for v in node.values]
+        if isinstance(node.op, ast.And):
+            return lambda flat: all(part(flat) for part in parts)
+        return lambda flat: any(part(flat) for part in parts)
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+        operand = _compile_logic_node(node.operand, expr)
+        return lambda flat: not operand(flat)
+    name = _dotted_name(node)
+    if name is None:
+        raise ValueError(
+            f"Unsupported term {ast.unparse(node)!r} in logic expression {expr!r}; "
+            "use field names with and, or, not and parentheses"
+        )
+    return lambda flat: bool(flat.get(name))
+
+
 def match_condition(value, match_type, pattern):
     if value is None or value == "" or value == []:
         return match_type == "null"
@@ -25,6 +110,15 @@ def match_condition(value, match_type, pattern):
     return False
 
 
+def group_path_matcher(group_by: str, group_type: str) -> Callable[[str], bool]:
+    """Whether a leaf path holds the group-by value for `path`/`terminal` grouping."""
+    if group_type == "path":
+        return lambda path: group_by in path
+    if group_type == "terminal":
+        return lambda path: path.split(".")[-1] == group_by
+    return lambda path: False
+
+
 def find_group_value(
     data: dict, group_by: str, group_type: str = "top", verbose: bool = False
 ) -> str:
@@ -35,12 +129,11 @@ def find_group_value(
         return value
 
     found = "<unknown>"
+    is_group_path = group_path_matcher(group_by, group_type)
 
     def visitor(path, value, context):
         nonlocal found
-        if group_type == "path" and group_by in path:
-            found = str(value)
-        elif group_type == "terminal" and path.split(".")[-1] == group_by:
+        if is_group_path(path):
             found = str(value)
 
     recursive_descent(data, path="", visitor=visitor)
@@ -60,6 +153,230 @@ def classify_type(value, char_limit: int) -> str:
     return "str"
 
 
+class TypeClassifier:
+    """
+    classify_type for one char_limit, memoized per value. Leaf values repeat
+    heavily across items (permissible values such as "Yes", "No" or "1"), so
+    most leaves are classified by a dict lookup.
+    """
+
+    def __init__(self, char_limit: int):
+        self.char_limit = char_limit
+        # strings are the bulk of the leaves and memoized by value; other
+        # scalars by (type, value), as 1, 1.0 and True compare equal
+        self._str_memo: Dict[str, str] = {}
+        self._memo: Dict[tuple, str] = {}
+
+    def classify(self, value) -> str:
+        if type(value) is str:
+            label = self._str_memo.get(value)
+            if label is None:
+                label = self._str_memo[value] = classify_type(value, self.char_limit)
+            return label
+        if value is None or type(value) not in (int, float, bool):
+            return classify_type(value, self.char_limit)
+        memo_key = (type(value), value)
+        label = self._memo.get(memo_key)
+        if label is None:
+            label = self._memo[memo_key] = classify_type(value, self.char_limit)
+        return label
+
+    def classify_many(self, values) -> List[str]:
+        """Classify a batch of values, e.g. all candidates for one field."""
+        str_memo, classify = self._str_memo, self.classify
+        labels = []
+        for value in values:
+            label = str_memo.get(value) if type(value) is str else None
+            labels.append(label if label is not None else classify(value))
+        return labels
+
+
+class CountQuery:
+    """
+    One count spec (the `count` options) compiled for evaluation. The leaf
+    walk is driven by count_queries, so several queries can share a single
+    traversal per item; `results` accumulates the NestedDict for this query.
+    """
+
+    def __init__(
+        self,
+        field_names: List[str],
+        match_type: str = "non_null",
+        value_match: Union[str, None] = None,
+        logic_expr: Union[str, None] = None,
+        group_by: Union[str, None] = None,
+        group_type: str = "top",
+        verbose: bool = False,
+        count_type: bool = False,
+        char_limit: int = 10,
+        name: str = "count",
+    ):
+        # the constructor arguments, to rebuild the query in worker processes
+        self.spec = dict(
+            field_names=field_names,
+            match_type=match_type,
+            value_match=value_match,
+            logic_expr=logic_expr,
+            group_by=group_by,
+            group_type=group_type,
+            verbose=verbose,
+            count_type=count_type,
+            char_limit=char_limit,
+            name=name,
+        )
+        self.name = name
+        self.matcher = FieldMatcher(field_names)
+        self.match_type = match_type
+        self.value_match = value_match
+        self.logic_expr = logic_expr
+        self.logic = compile_logic(logic_expr) if logic_expr else None
+        self.group_by = group_by
+        self.group_type = group_type
+        self.verbose = verbose
+        self.count_type = count_type
+        self.char_limit = char_limit
+        self.classifier = TypeClassifier(char_limit)
+        self.walk_groups = bool(group_by) and group_type != "top"
+        self.is_group_path = group_path_matcher(group_by, group_type) if self.walk_groups else None
+        self.results: NestedDict = {}
+
+    def keep(self, path: str) -> bool:
+        """Whether the traversal must reach `path` for this query."""
+        return self.matcher.key(path) is not None or (
+            self.walk_groups and self.is_group_path(path)
+        )
+
+    def count_leaf(self, flat: Dict[str, int], flat_values: Dict[str, object], key: str, value):
+        match_type = self.match_type
+        if match_type == "non_null" and value not in (None, "", [], "null"):
+            flat[key] = flat.get(key, 0) + 1
+        elif match_type == "null" and value in (None, "", [], "null"):
+            flat[key] = flat.get(key, 0) + 1
+        elif match_type in {"fixed", "regex"} and match_condition(
+            value, match_type, self.value_match
+        ):
+            flat[key] = flat.get(key, 0) + 1
+
+        if self.count_type:
+            # typed by the field's last value; classified in add_item
+            flat_values[key] = value
+
+    def add_item(self, data: dict, flat: Dict[str, int], flat_values: Dict[str, object], group_found):
+        """Apply --logic to one item's field counts and add them to `results`."""
+        group_by, verbose, count_type = self.group_by, self.verbose, self.count_type
+        if verbose:
+            logger.debug(f"[DEBUG] flat keys: {flat}")
+            logger.debug(f"[DEBUG] logic_expr: {self.logic_expr}")
+
+        result = self.logic(flat) if self.logic else any(flat.values())
+        if not result:
+            return
+
+        if not group_by:
+            group_value = "<global>"
+        elif self.group_type == "top":
+            group_value = str(data.get(group_by, "<unknown>"))
+            if verbose:
+                print(f"[GROUP-BY] top-level '{group_by}' = {group_value}")
+        else:
+            group_value = str(group_found)
+            if verbose:
+                print(f"[GROUP-BY] {self.group_type}-match '{group_by}' = {group_value}")
+        flat_types: Dict[str, str] = {}
+        if count_type:
+            flat_types = dict(zip(flat_values, self.classifier.classify_many(flat_values.values())))
+        if verbose and count_type:
+            logger.debug(f"[DEBUG] Typed keys: {flat_types}")
+        group_value = str(group_value)  # ensure it's a string key
+        for key, count in flat.items():
+            if count_type:
+                val_type = flat_types.get(key, "unknown")
+                if verbose:
+                    logger.debug(
+                        f"[DEBUG] Incrementing {key} -> {val_type} -> {group_value} by {count}"
+                    )
+                safe_nested_increment(self.results, key, val_type, group_value, v=count)  # type: ignore
+            else:
+                safe_nested_increment(self.results, key, group_value, v=count)  # type: ignore
+
+
+def count_queries(
+    items, queries: List[CountQuery], prune: bool = True, on_item: Union[Callable[[], None], None] = None
+) -> List[NestedDict]:
+    """
+    Evaluate several CountQuery specs with one model_dump and one traversal
+    per item, returning each query's results in order.
+
+    Each distinct leaf path is resolved once to the queries that count it or
+    take their group-by value from it. With `prune`, the traversal skips the
+    subtrees its schema says no query needs; the counts are the same. A
+    `path`/`terminal` group-by value is the last matching leaf, as in
+    find_group_value. `on_item`, if given, is called after each item has
+    been added to the results.
+    """
+    n = len(queries)
+    routes: Dict[str, tuple] = {}
+    plans: Dict[type, object] = {}
+    for item in items:
+        flats: List[Dict[str, int]] = [{} for _ in range(n)]
+        flat_values: List[Dict[str, object]] = [{} for _ in range(n)]
+        groups = ["<unknown>"] * n
+
+        plan = WALK_ALL
+        if prune:
+            plan = plans.get(type(item))
+            if plan is None:
+                plan = plans[type(item)] = schema_prune_plan(
+                    type(item), lambda path: any(q.keep(path) for q in queries)
+                )
+
+        data = item.model_dump()
+        for path, value in iter_leaves(data, plan):
+            route = routes.get(path)
+            if route is None:
+                route = routes[path] = tuple(
+                    (i, q.count_leaf, q.matcher.key(path), q.walk_groups and q.is_group_path(path))
+                    for i, q in enumerate(queries)
+                    if q.keep(path)
+                )
+            for i, count_leaf, key, in_group in route:
+                if in_group:
+                    groups[i] = value
+                if key is not None:
+                    count_leaf(flats[i], flat_values[i], key, value)
+
+        for i, q in enumerate(queries):
+            q.add_item(data, flats[i], flat_values[i], groups[i])
+        if on_item is not None:
+            on_item()
+
+    return [q.results for q in queries]
+
+
+def _count_chunk(model_class, specs: List[dict], prune: bool, objs: list) -> List[List[NestedDict]]:
+    """Validate and count one chunk of raw items in a worker: [per-query results]."""
+    queries = [CountQuery(**spec) for spec in specs]
+    return [count_queries((model_class.model_validate(obj) for obj in objs), queries, prune=prune)]
+
+
+def count_queries_sharded(
+    raw_items, model_class, queries: List[CountQuery], workers: int, prune: bool = True
+) -> List[NestedDict]:
+    """
+    count_queries with the items validated and counted in `workers` processes.
+
+    `raw_items` (e.g. iter_json of the input) is split into chunks; each
+    worker returns partial results per query, which are merged into the
+    queries' `results` in input order, so the output is the same as a single
+    pass, key order included.
+    """
+    count_chunk = partial(_count_chunk, model_class, [q.spec for q in queries], prune)
+    for partials in imap_chunks(count_chunk, raw_items, workers):
+        for q, partial_results in zip(queries, partials):
+            merge_nested_counts(q.results, partial_results)
+    return [q.results for q in queries]
+
+
 def count_matching_fields(
     items,
     field_names: List[str],
@@ -71,73 +388,161 @@ def count_matching_fields(
     verbose: bool = False,
     count_type: bool = False,
     char_limit: int = 10,
+    prune: bool = True,
 ) -> NestedDict:
+    """
+    Count one spec; see CountQuery and count_queries. With `prune`, each
+    item's traversal skips the subtrees its schema says cannot hold a path
+    matching `field_names` or the group-by path; the counts are the same.
+    """
+    query = CountQuery(
+        field_names,
+        match_type=match_type,
+        value_match=value_match,
+        logic_expr=logic_expr,
+        group_by=group_by,
+        group_type=group_type,
+        verbose=verbose,
+        count_type=count_type,
+        char_limit=char_limit,
+    )
+    return count_queries(items, [query], prune=prune)[0]
 
-    results: NestedDict = {}
-    for item in items:
-        flat: Dict[str, int] = {}
-        flat_types: Dict[str, str] = {}
 
-        def visitor(path, value, context):
-            base_name = path.split(".")[-1]
-            matched = any(
-                fn == path
-                or fn == base_name
-                or ("*" in fn and re.fullmatch(fn.replace("*", ".*"), path))
-                for fn in field_names
-            )
-            if matched:
-                key = path if path in field_names else base_name
-                if match_type == "non_null" and value not in (None, "", [], "null"):
-                    flat[key] = flat.get(key, 0) + 1
-                elif match_type == "null" and value in (None, "", [], "null"):
-                    flat[key] = flat.get(key, 0) + 1
-                elif match_type in {"fixed", "regex"} and match_condition(
-                    value, match_type, value_match
-                ):
-                    flat[key] = flat.get(key, 0) + 1
-
-                if count_type:
-                    flat_types[key] = classify_type(value, char_limit)
-
-        recursive_descent(item.model_dump(), path="", visitor=visitor)
+# ------------------------------
+# Vectorized backend over export_columnar tables
+# ------------------------------
 
-        if verbose:
-            logger.debug(f"[DEBUG] flat keys: {flat}")
-            logger.debug(f"[DEBUG] logic_expr: {logic_expr}")
 
-        try:
-            result = (
-                eval(logic_expr, {}, {k: bool(v) for k, v in flat.items()})
-                if logic_expr
-                else any(flat.values())
+def count_queries_columnar(table, queries: List[CountQuery], model_class=None) -> List[NestedDict]:
+    """
+    Evaluate CountQuery specs over a leaf table written by export_columnar,
+    producing the same NestedDict results (and key order) as count_queries.
+
+    Field matching, match conditions, type classification and group-by paths
+    are resolved once per distinct path or value and broadcast to the rows
+    with pyarrow compute; counts are summed with hash group-bys down to one
+    row per (field, type, group) cell. Only a --logic expression is evaluated
+    per item in Python. A `top` group-by must name a scalar field of
+    `model_class` when one is given.
+    """
+    pa, _ = require_pyarrow()
+    import pyarrow.compute as pc
+
+    table = table.select(["item", "path", "value", "type"]).unify_dictionaries().combine_chunks()
+    if table.num_rows == 0:
+        return [q.results for q in queries]
+    path_col = table.column("path").chunk(0)
+    paths = path_col.dictionary.to_pylist()
+    base = pa.table(
+        {
+            "item": table.column("item"),
+            "row": pa.array(range(table.num_rows), pa.int64()),
+            "value": table.column("value"),
+            "type": table.column("type").cast(pa.string()),
+        }
+    )
+    n_items = pc.max(base.column("item")).as_py() + 1
+    # str(value) as count prints it for group-by values: None -> "None"
+    str_values = pc.fill_null(base.column("value"), "None")
+    # one code per distinct (type, value) leaf, for classify_type
+    leaf_codes = pc.binary_join_element_wise(
+        base.column("type"), pc.fill_null(base.column("value"), ""), "\x00"
+    ).dictionary_encode().combine_chunks()
+    leaves = [
+        leaf_value(value if type_name != "null" else None, type_name)
+        for type_name, value in (u.split("\x00", 1) for u in leaf_codes.dictionary.to_pylist())
+    ]
+
+    def per_path(flags: list, type_=pa.int32()):
+        return pc.take(pa.array(flags, type_), path_col.indices)
+
+    def group_values(mask):
+        """Per-item str(value) of the last row in `mask`, "<unknown>" if none."""
+        rows = base.filter(mask).group_by("item", use_threads=False).aggregate([("row", "max")])
+        found = ["<unknown>"] * n_items
+        for item, value in zip(
+            rows.column("item").to_pylist(), pc.take(str_values, rows.column("row_max")).to_pylist()
+        ):
+            found[item] = value
+        return pa.array(found, pa.string())
+
+    for q in queries:
+        names = sorted({k for k in (q.matcher.key(p) for p in paths) if k is not None})
+        code = {name: i for i, name in enumerate(names)}
+        row_key = per_path([code.get(q.matcher.key(p), -1) for p in paths])  # type: ignore[arg-type]
+        sub = base.append_column("key", row_key).filter(pc.not_equal(row_key, -1))
+        v, t = sub.column("value"), sub.column("type")
+
+        is_str = pc.equal(t, "str")
+        if q.match_type in ("non_null", "null"):
+            nullish = pc.or_(
+                pc.equal(t, "null"),
+                pc.and_(is_str, pc.is_in(v, value_set=pa.array(["", "null"]))),
             )
-        except Exception as e:
-            if verbose:
-                logger.warning(f"[ERROR] Failed logic eval: {e}")
-                logger.debug(f"[DEBUG] flat keys available: {list(flat.keys())}")
-            result = False
-
-        if result:
-            group_value = (
-                find_group_value(
-                    item.model_dump(), group_by, group_type, verbose=verbose
-                )
-                if group_by
-                else "<global>"
+            cond = pc.invert(nullish) if q.match_type == "non_null" else nullish
+        elif q.match_type == "fixed" and q.value_match not in (None, ""):
+            cond = pc.and_(is_str, pc.equal(v, q.value_match))
+        elif q.match_type == "regex":
+            pattern = re.compile(q.value_match)  # type: ignore[arg-type]
+            matched = [u for u in pc.unique(v).to_pylist() if u and pattern.search(u)]
+            cond = pc.and_(
+                pc.invert(pc.equal(t, "null")),
+                pc.is_in(v, value_set=pa.array(matched, pa.string())),
+            )
+        else:
+            cond = pa.array([False] * sub.num_rows, pa.bool_())
+        cond = pc.fill_null(cond, False)
+
+        sub = sub.append_column("hit", pc.cast(cond, pa.int64())).append_column(
+            "hit_row", pc.if_else(cond, sub.column("row"), pa.scalar(None, pa.int64()))
+        )
+        # one row per (item, field) with hits: the item's `flat` entries
+        pairs = sub.group_by(["item", "key"], use_threads=False).aggregate(
+            [("hit", "sum"), ("hit_row", "min"), ("row", "max")]
+        )
+        pairs = pairs.filter(pc.greater(pairs.column("hit_sum"), 0))
+
+        if q.logic:
+            flats: Dict[int, Dict[str, int]] = {}
+            ordered = sorted(
+                zip(*(pairs.column(c).to_pylist() for c in ("hit_row_min", "item", "key", "hit_sum")))
             )
-            if verbose and count_type:
-                logger.debug(f"[DEBUG] Typed keys: {flat_types}")
-            group_value = str(group_value)  # ensure it's a string key
-            for key, count in flat.items():
-                if count_type:
-                    val_type = flat_types.get(key, "unknown")
-                    if verbose:
-                        logger.debug(
-                            f"[DEBUG] Incrementing {key} -> {val_type} -> {group_value} by {count}"
-                        )
-                    safe_nested_increment(results, key, val_type, group_value, v=count)  # type: ignore
-                else:
-                    safe_nested_increment(results, key, group_value, v=count)  # type: ignore
-
-    return results
+            for _, item, key, count in ordered:
+                flats.setdefault(item, {})[names[key]] = count
+            passing = [item for item, flat in flats.items() if q.logic(flat)]
+            pairs = pairs.filter(pc.is_in(pairs.column("item"), value_set=pa.array(passing, pa.int64())))
+
+        cell = ["key"]
+        if q.count_type:
+            codes = pc.take(leaf_codes.indices, pairs.column("row_max"))
+            distinct = pc.unique(codes)
+            labels = q.classifier.classify_many(leaves[c] for c in distinct.to_pylist())
+            types = pc.take(pa.array(labels, pa.string()), pc.index_in(codes, value_set=distinct))
+            pairs = pairs.append_column("val_type", types)
+            cell.append("val_type")
+        if q.walk_groups:
+            groups = group_values(per_path([q.is_group_path(p) for p in paths], pa.bool_()))
+        elif q.group_by:
+            if model_class is not None and q.group_by in model_class.model_fields:
+                if schema_tree(model_class.model_fields[q.group_by].annotation) != {}:
+                    raise ValueError(
+                        f"Columnar count can't group by non-scalar top-level field {q.group_by!r}"
+                    )
+            groups = group_values(per_path([p == q.group_by for p in paths], pa.bool_()))
+        else:
+            groups = pa.array(["<global>"] * n_items, pa.string())
+        pairs = pairs.append_column("group", pc.take(groups, pairs.column("item")))
+        cell.append("group")
+
+        # NestedDict keys appear in order of their first counted leaf, so
+        # filling the cells by first hit reproduces count_queries' ordering.
+        cells = pairs.group_by(cell, use_threads=False).aggregate(
+            [("hit_sum", "sum"), ("hit_row_min", "min")]
+        ).sort_by("hit_row_min_min")
+        columns = [cells.column(c).to_pylist() for c in cell + ["hit_sum_sum"]]
+        for key, *rest in zip(*columns):
+            *levels, count = rest
+            safe_nested_increment(q.results, names[key], *levels, v=count)  # type: ignore
+
+    return [q.results for q in queries]
@@ -1,12 +1,12 @@
 import actions
-import json
 import csv
 import pydantic
 import re
 import logging
-from typing import List, Dict, Optional, Type, TypeVar
+from typing import Any, Iterable, Iterator, List, Dict, Optional, Type, TypeVar
 from pydantic import BaseModel
 from utils.helpers import extract_embed_project_fields_by_tinyid
+from utils.output_writer import open_output, write_json_array, write_jsonl
 from utils.path_utils import (
     load_path_schema,
     get_path_value,
@@ -18,7 +18,7 @@ from utils.analyzer_state import get_verbosity, set_verbosity
 from utils.extract_embed import (
     simplify_permissible_values,
     normalize_extracted_value,
-    strip_json_list,
+    strip_json,
     strip_embedded_nl,
     sanitize,
 )
@@ -32,24 +32,20 @@ ModelType = TypeVar("ModelType", bound=BaseModel)
 
 # This function can be generalized by changing data to a List[Basemodel]
 # would need to check the schmema_path for validity
-def extract_path(
+def extract_rows(
     model_class: Type[ModelType],
-    data: List[Dict],
+    items: Iterable[ModelType],
     tinyids: List[str],
-    output: Optional[str] = None,
-    format: str = "json",
     schema_path: Optional[str] = None,
     exclude: bool = False,
     collapse: bool = False,
     simplify: bool = False,
-):
-    # model_class = MODEL_REGISTRY[args.model]
-    items = [model_class.model_validate(obj) for obj in data]
+) -> Iterator[Dict[str, Any]]:
+    """Yield one extracted row per item, in input order."""
     log_if_verbose(f"[DEBUG] The list of tinyIds is: {tinyids}", 1)
     qn = 0  # counter to skip subsequent designations in path
     if schema_path:
         schema = load_path_schema(schema_path)
-        rows = []
         for item in items:
             if exclude:
                 if item.tinyId in tinyids:  # type: ignore
@@ -57,6 +53,7 @@ def extract_path(
                     log_if_verbose(log_message, 2)
                     continue
             row: Dict[str, str] = {"tinyId": item.tinyId}  # type: ignore
+            data = item.model_dump()
 
             # Here start iterating over the path_expr read in from file
             #   Must add dynamic_tag with designations.*.designation
@@ -85,7 +82,7 @@ def extract_path(
                     row.update(result)  # type: ignore
                     # continue
 
-                val = get_path_value(item.model_dump(), path_expr)
+                val = get_path_value(data, path_expr)
                 log_if_verbose(f"[extract_embed logic] Check tinyId: {item.tinyId}", 2)  # type: ignore
                 # Here the even more complex simplification of permissibleValueSets.
                 #   The problem is that PVs can have permissibleValue (pv), valueMeaningDefinition (vmd) and
@@ -112,26 +109,41 @@ def extract_path(
                     val = normalize_extracted_value(val, collapse=collapse)
 
                 row[tag] = val if val is not None else ""  # type: ignore
-            rows.append(row)
+            yield row
     else:
-        rows = extract_embed_project_fields_by_tinyid(data, tinyids, exclude)
+        yield from extract_embed_project_fields_by_tinyid(items, tinyids, exclude)
+
 
+def write_rows(
+    rows: Iterable[Dict[str, Any]], output: Optional[str] = None, format: str = "json"
+):
+    """
+    Write extracted rows to `output` (stdout if not set) as `format`. JSON and
+    JSON Lines rows are streamed; csv/tsv rows are collected first, as the
+    header comes from the first row.
+    """
     if not output:
-        print(json.dumps(rows, indent=2))
+        if format == "jsonl":
+            write_jsonl(rows, None)
+        else:
+            write_json_array(rows, None)
         return
 
     # clean up leading/trailing whitespace on some data values
-    rows = strip_json_list(rows)
-    if format == "json":
-        with open(output, "w") as f:
-            json.dump(rows, f, indent=2)
+    rows = (strip_json(row) for row in rows)
+    if format == "jsonl":
+        write_jsonl(rows, output)
+    elif format == "json":
+        write_json_array(rows, output)
     elif format == "csv":
-        with open(output, "w", encoding="utf-8", newline="") as f:
+        rows = list(rows)
+        with open_output(output) as f:
             writer = csv.DictWriter(f, fieldnames=rows[0].keys())
             writer.writeheader()
             writer.writerows(rows)
     elif format == "tsv":
-        with open(output, "w", encoding="utf-8", newline="") as f:
+        rows = list(rows)
+        with open_output(output) as f:
             writer = csv.DictWriter(f, fieldnames=rows[0].keys(), delimiter="\t")
             writer.writeheader()
             writer.writerows(rows)
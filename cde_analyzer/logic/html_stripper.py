@@ -3,13 +3,15 @@ import yaml  # pip install pyyaml
 import csv
 import warnings
 import json
+from functools import partial
 from pathlib import Path
-from typing import Any, Type, List, Optional, Dict, Union
+from typing import Any, Iterable, Iterator, Type, List, Optional, Dict, Union
 from pydantic import BaseModel
 from CDE_Schema import CDEForm, CDEItem
 from utils.html import clean_text_values
 from utils.output_writer import save_data
-from utils.cde_impexport import load_json
+from utils.cde_impexport import map_models, is_stdio
+from utils.compression import compression_of, strip_compression_suffix
 from utils.logger import logging
 
 
@@ -22,18 +24,18 @@ MODEL_REGISTRY: dict[str, Type[BaseModel]] = {
 }
 
 
-def process_data(
-    data: Union[list, dict], model_class: Type[BaseModel], set_keys, tables, colnames
-) -> List[Dict]:
-    logger.debug(f"Raw input type: {type(data).__name__}")
-    if isinstance(data, dict):
-        data = [data]
-    elif not isinstance(data, list):
-        raise ValueError("Input must be a dict or list of dicts.")
+def clean_models(
+    models: Iterable[BaseModel], set_keys, tables, colnames
+) -> Iterator[BaseModel]:
+    for model in models:
+        yield clean_text_values(model, set_keys, tables, colnames)
+
 
-    models = [model_class(**item) for item in data]
-    cleaned = [clean_text_values(model, set_keys, tables, colnames) for model in models]
-    return [model.model_dump(by_alias=True) for model in cleaned]
+def process_data(
+    models: Iterable[BaseModel], set_keys, tables, colnames
+) -> Iterator[Dict]:
+    for cleaned in clean_models(models, set_keys, tables, colnames):
+        yield cleaned.model_dump(by_alias=True)
 
 
 def process_file(
@@ -46,16 +48,30 @@ def process_file(
     pretty: bool,
     tables: bool,
     colnames: bool,
+    workers: int = 1,
 ):
+    """
+    Items are cleaned and dumped in `workers` processes when there are several.
+    A `filepath` of `-` reads standard input; an `outdir` of `-` writes the
+    cleaned items to standard output.
+    """
     logger.info(f"Processing: {filepath}")
     try:
-        raw_data = load_json(filepath)
-        cleaned_data = process_data(raw_data, model_class, set_keys, tables, colnames)
+        cleaned_data = map_models(
+            filepath,
+            model_class,
+            partial(process_data, set_keys=set_keys, tables=tables, colnames=colnames),
+            workers,
+        )
 
-        output_path = outdir / f"{filepath.stem}_nohtml.{fmt}"
+        # keep the input's compression: cde.json.gz -> cde_nohtml.json.gz
+        codec = filepath.suffix if compression_of(filepath) else ""
+        stem = "stdin" if is_stdio(filepath) else Path(strip_compression_suffix(filepath)).stem
+        output_path = outdir if is_stdio(outdir) else outdir / f"{stem}_nohtml.{fmt}{codec}"
 
         if dry_run:
-            logger.info(f"[Dry-run] Would write: {output_path}")
+            n = sum(1 for _ in cleaned_data)
+            logger.info(f"[Dry-run] Would write {n} items to: {output_path}")
         else:
             save_data(cleaned_data, output_path, fmt, pretty)
             logger.info(f"Saved cleaned data to: {output_path}")
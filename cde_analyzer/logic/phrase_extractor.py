@@ -1,20 +1,59 @@
 import re
 import logging
 from collections import defaultdict
-from typing import Any, Dict, List, Set, Optional, DefaultDict, Tuple, Union, TypeAlias
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Set, Optional, DefaultDict, Tuple, Union, TypeAlias
 from utils.helpers import safe_nested_append
 from utils.logger import log_if_verbose
+from utils.parallel import imap_chunks
 from utils.phrase_pruning import (
     prune_subphrases_threshold,
     prune_subphrases_by_tinyid,
     prune_subphrases_global,
 )
-from utils.phrase_extraction import collect_phrases_from_item, PhraseMap, NestedDict
+from utils.phrase_extraction import (
+    add_distinct,
+    add_member,
+    add_word_cache_entries,
+    collect_phrases_from_item,
+    drain_word_cache_entries,
+    init_word_caches,
+    merge_phrase_maps,
+    members_of,
+    KeyedPhraseMap,
+    Members,
+    NGramIndex,
+    PhraseMap,
+    NestedDict,
+    PendingField,
+    log_word_cache_stats,
+    phrase_words_many,
+    record_phrases,
+    require_nltk,
+    word_cache_snapshot,
+)
 
 
 # logger = logging.getLogger("cde_analyzer.phrase")
 logger = logging.getLogger(__name__)
 
+DEFAULT_TAG_BATCH_SIZE = 1000
+
+# The phrases of some items before filtering: the index, and the tinyIds and
+# (with verbatim) field values per path and phrase key
+PhraseMaps: TypeAlias = Tuple[NGramIndex, KeyedPhraseMap, Optional[KeyedPhraseMap]]
+# A matched field and its phrase words: (path, value, interned tinyId, words)
+PhraseField: TypeAlias = Tuple[str, str, int, List[str]]
+
+
+def mines_level_wise(min_ids: int, prune: str, min_words: int) -> bool:
+    """
+    Whether phrases can be mined level-wise (mine_phrase_maps) without
+    changing the output: tinyid and global pruning also compare the phrases
+    below min_ids.
+    """
+    return min_ids >= 2 and prune not in ("tinyid", "global") and min_words >= 1
+
 
 def collect_all_phrase_occurrences(
     items: List[Any],
@@ -26,15 +65,176 @@ def collect_all_phrase_occurrences(
     prune: str = "none",
     lemmatize: bool = True,
     verbatim: bool = False,
+    max_words: Optional[int] = None,
+    tag_batch_size: int = DEFAULT_TAG_BATCH_SIZE,
 ) -> Dict[str, Dict[str, List[str]]]:
     """
     Process all items and return a dict:
       field_path -> phrase -> list of tinyIDs
-    Only includes phrases appearing in at least min_ids unique tinyIDs.
+    Only includes phrases appearing in at least min_ids unique tinyIDs, and
+    of at most max_words words if given. Matched field values are tokenized
+    and POS tagged about `tag_batch_size` at a time.
+    """
+    if mines_level_wise(min_ids, prune, min_words):
+        ngrams = NGramIndex()
+        fields = collect_phrase_fields(
+            items, field_names, ngrams, verbosity, remove_stopwords, lemmatize, tag_batch_size
+        )
+        maps = mine_phrase_maps(fields, ngrams, min_ids, min_words, max_words, verbatim)
+    else:
+        maps = collect_phrase_maps(
+            items,
+            field_names,
+            verbosity=verbosity,
+            min_words=min_words,
+            remove_stopwords=remove_stopwords,
+            lemmatize=lemmatize,
+            verbatim=verbatim,
+            max_words=max_words,
+            tag_batch_size=tag_batch_size,
+        )
+    log_word_cache_stats()
+    return phrase_output(maps, min_ids=min_ids, prune=prune, verbatim=verbatim)
+
+
+def _collect_chunk(model_class, options: dict, objs: list) -> List[Tuple[PhraseMaps, Any]]:
+    """
+    Validate one chunk of raw items and collect its phrases in a worker:
+    [(its phrase maps, the word cache entries it added)].
+    """
+    maps = collect_phrase_maps((model_class.model_validate(obj) for obj in objs), **options)
+    return [(maps, drain_word_cache_entries())]
+
+
+def _collect_fields_chunk(
+    model_class, options: dict, objs: list
+) -> List[Tuple[List[str], List[PhraseField], Any]]:
+    """
+    Validate one chunk of raw items in a worker: [(its tinyIds, its fields
+    and their words, the word cache entries it added)].
+    """
+    ngrams = NGramIndex()
+    models = (model_class.model_validate(obj) for obj in objs)
+    fields = list(collect_phrase_fields(models, ngrams=ngrams, **options))
+    return [(ngrams.tiny_ids.values, fields, drain_word_cache_entries())]
+
+
+def _add_worker_cache_entries(entries):
+    # None for chunks run in this process, whose entries are already cached
+    if entries is not None:
+        add_word_cache_entries(*entries)
+
+
+def collect_all_phrase_occurrences_sharded(
+    raw_items,
+    model_class,
+    field_names: List[str],
+    workers: int,
+    verbosity: int = 0,
+    min_words: int = 2,
+    remove_stopwords: bool = True,
+    min_ids: int = 2,
+    prune: str = "none",
+    lemmatize: bool = True,
+    verbatim: bool = False,
+    max_words: Optional[int] = None,
+    tag_batch_size: int = DEFAULT_TAG_BATCH_SIZE,
+    word_cache: bool = False,
+) -> Dict[str, Dict[str, List[str]]]:
+    """
+    collect_all_phrase_occurrences with the items validated and their phrases
+    collected in `workers` processes.
+
+    `raw_items` (e.g. iter_json of the input) is split into chunks; each
+    worker returns the phrase maps of its chunk, which are merged in input
+    order before filtering and pruning, so the output is the same as a single
+    pass. When phrases are mined level-wise, workers return their fields'
+    words instead and the mining is done here. NLTK is loaded once per worker
+    process.
+
+    Workers get caches of this process's size. With `word_cache`, they also
+    start from its entries (e.g. from load_word_caches) and send back the
+    ones they add, so save_word_caches afterwards covers every worker.
+    """
+    options = dict(
+        field_names=field_names,
+        verbosity=verbosity,
+        remove_stopwords=remove_stopwords,
+        lemmatize=lemmatize,
+        tag_batch_size=tag_batch_size,
+    )
+    pool = dict(initializer=init_word_caches, initargs=word_cache_snapshot(word_cache))
+    ngrams = NGramIndex()
+    if mines_level_wise(min_ids, prune, min_words):
+        collect_fields = partial(_collect_fields_chunk, model_class, options)
+
+        def fields() -> Iterator[PhraseField]:
+            for tiny_ids, chunk_fields, cache_entries in imap_chunks(
+                collect_fields, raw_items, workers, **pool
+            ):
+                _add_worker_cache_entries(cache_entries)
+                translate = [ngrams.tiny_ids(tiny_id) for tiny_id in tiny_ids]
+                for path, value, tiny_id, words in chunk_fields:
+                    yield path, value, translate[tiny_id], words
+
+        maps = mine_phrase_maps(fields(), ngrams, min_ids, min_words, max_words, verbatim)
+        return phrase_output(maps, min_ids=min_ids, prune=prune, verbatim=verbatim)
+
+    options.update(min_words=min_words, verbatim=verbatim, max_words=max_words)
+    final_result: KeyedPhraseMap = defaultdict(dict)
+    verbatim_map: Optional[KeyedPhraseMap] = defaultdict(dict) if verbatim else None
+    collect_chunk = partial(_collect_chunk, model_class, options)
+    for (chunk_ngrams, chunk_result, chunk_verbatim), cache_entries in imap_chunks(
+        collect_chunk, raw_items, workers, **pool
+    ):
+        _add_worker_cache_entries(cache_entries)
+        tiny_ids, sources = ngrams.merge(chunk_ngrams)
+        merge_phrase_maps(final_result, chunk_result, tiny_ids)
+        if verbatim_map is not None:
+            merge_phrase_maps(verbatim_map, chunk_verbatim, sources, add_distinct)  # type: ignore[arg-type]
+    return phrase_output(
+        (ngrams, final_result, verbatim_map), min_ids=min_ids, prune=prune, verbatim=verbatim
+    )
+
+
+def collect_phrase_fields(
+    items: Iterable[Any],
+    field_names: List[str],
+    ngrams: NGramIndex,
+    verbosity: int = 0,
+    remove_stopwords: bool = True,
+    lemmatize: bool = True,
+    tag_batch_size: int = DEFAULT_TAG_BATCH_SIZE,
+) -> Iterator[PhraseField]:
+    """
+    The fields of `items` matching `field_names` with their phrase words, in
+    item order. TinyIds are interned in `ngrams.tiny_ids`.
     """
-    final_result: PhraseMap = defaultdict(lambda: defaultdict(set))
-    verbatim_map: PhraseMap = defaultdict(lambda: defaultdict(set))
     field_set = set(field_names)
+    # Fail before reading the items if NLTK data is missing, naming all of it
+    require_nltk(
+        "tokenize",
+        *(["stopwords"] if remove_stopwords else []),
+        *(["lemmatize"] if lemmatize else []),
+    )
+
+    pending: List[PendingField] = []
+
+    def with_words() -> List[PhraseField]:
+        # Fields nested in lists may differ in `lemmatize` from the top level
+        words: List[Optional[List[str]]] = [None] * len(pending)
+        for flag in (True, False):
+            indices = [i for i, field in enumerate(pending) if field[3] is flag]
+            if indices:
+                texts = [pending[i][1] for i in indices]
+                for i, field_words in zip(indices, phrase_words_many(texts, remove_stopwords, flag)):
+                    words[i] = field_words
+        fields = [
+            (path, value, tiny_id, field_words)
+            for (path, value, tiny_id, _), field_words in zip(pending, words)
+        ]
+        pending.clear()
+        return fields  # type: ignore[return-value]
 
     for item in items:
         tiny_id = getattr(item, "tinyId", None)
@@ -43,21 +243,194 @@ def collect_all_phrase_occurrences(
         collect_phrases_from_item(
             item=item,
             field_names=field_set,
-            tiny_id=tiny_id,
-            results=final_result,
-            verbatim_results=verbatim_map,
-            min_words=min_words,
+            tiny_id=ngrams.tiny_ids(tiny_id),  # type: ignore[arg-type]
             remove_stopwords=remove_stopwords,
             verbosity=verbosity,
             lemmatize=lemmatize,
+            ngrams=ngrams,
+            pending=pending,
+        )
+        if len(pending) >= tag_batch_size:
+            yield from with_words()
+    yield from with_words()
+
+
+def collect_phrase_maps(
+    items: Iterable[Any],
+    field_names: List[str],
+    verbosity: int = 0,
+    min_words: int = 2,
+    remove_stopwords: bool = True,
+    lemmatize: bool = True,
+    verbatim: bool = False,
+    max_words: Optional[int] = None,
+    tag_batch_size: int = DEFAULT_TAG_BATCH_SIZE,
+) -> PhraseMaps:
+    """All phrases of `items`, before min_ids filtering and pruning (see phrase_output)."""
+    # Phrases, tinyIds and field values are collected as integers (see
+    # NGramIndex) and only turned back into strings for the output.
+    ngrams = NGramIndex()
+    final_result: KeyedPhraseMap = defaultdict(dict)
+    verbatim_map: Optional[KeyedPhraseMap] = defaultdict(dict) if verbatim else None
+    fields = collect_phrase_fields(
+        items, field_names, ngrams, verbosity, remove_stopwords, lemmatize, tag_batch_size
+    )
+    for path, value, tiny_id, words in fields:
+        record_phrases(
+            path,
+            value,
+            words,
+            tiny_id,
+            final_result,
+            verbatim_map,
+            ngrams,
+            min_words,
+            max_words,
+            verbosity,
+        )
+    return ngrams, final_result, verbatim_map
+
+
+def mine_phrase_maps(
+    fields: Iterable[PhraseField],
+    ngrams: NGramIndex,
+    min_ids: int,
+    min_words: int = 2,
+    max_words: Optional[int] = None,
+    verbatim: bool = False,
+) -> PhraseMaps:
+    """
+    collect_phrase_maps' result for `fields`, restricted to the phrases in at
+    least `min_ids` tinyIds (their output without pruning is the same).
+
+    Phrases are mined level-wise (Apriori): all phrases of min_words words
+    are counted, and only those whose two sub-phrases one word shorter are
+    both frequent in the same path are counted at the next length, as a
+    phrase can't be in more tinyIds than its sub-phrases. The kept phrases
+    are ordered by where collect_phrase_maps first finds them: field, then
+    length, then position.
+    """
+    final_result: KeyedPhraseMap = defaultdict(dict)
+    verbatim_map: Optional[KeyedPhraseMap] = defaultdict(dict) if verbatim else None
+    # Fields with the same words in the same path have the same phrases, so
+    # phrases are found once per distinct text: (path, prefix hashes,
+    # ngrams.fields index, first field), and counted per field: (text,
+    # tinyId, value ID)
+    texts: List[tuple] = []
+    text_ids: Dict[Tuple[str, Tuple[str, ...]], int] = {}
+    occurrences: List[Tuple[int, int, int]] = []
+    starts: List[Sequence[int]] = []  # per text, where phrases of the current length are
+    for path, value, tiny_id, words in fields:
+        n = len(words)
+        if (n if max_words is None else min(n, max_words)) < min_words:
+            continue
+        final_result[path]  # paths in the order collect_phrase_maps adds them
+        text = text_ids.get((path, tuple(words)))
+        if text is None:
+            text = text_ids[path, tuple(words)] = len(texts)
+            texts.append((path, ngrams.prefix_hashes(words), len(ngrams.fields), len(occurrences)))
+            ngrams.fields.append(words)
+            starts.append(range(n - min_words + 1))
+        occurrences.append((text, tiny_id, ngrams.sources(value) if verbatim else -1))
+    del text_ids
+
+    # path -> [(field, size, start, key, members, values)] of frequent phrases
+    found: DefaultDict[str, List[tuple]] = defaultdict(list)
+    seen: DefaultDict[str, Set[int]] = defaultdict(set)
+    size = min_words
+    while any(starts) and (max_words is None or size <= max_words):
+        text_keys = [
+            ngrams.keys_at(prefixes, positions, size) if positions else []
+            for (_, prefixes, _, _), positions in zip(texts, starts)
+        ]
+        support: DefaultDict[str, Dict[int, Members]] = defaultdict(dict)
+        values: DefaultDict[str, Dict[int, Members]] = defaultdict(dict)
+        for text, tiny_id, source in occurrences:
+            keys = text_keys[text]
+            if not keys:
+                continue
+            path = texts[text][0]
+            path_support = support[path]
+            for key in keys:
+                add_member(path_support, key, tiny_id)
+            if verbatim:
+                path_values = values[path]
+                for key in keys:
+                    add_distinct(path_values, key, source)
+        frequent = {
+            path: {
+                key
+                for key, members in path_support.items()
+                if type(members) is not int
+                and len(members) >= min_ids
+                and len(members_of(members)) >= min_ids
+            }
+            for path, path_support in support.items()
+        }
+        log_if_verbose(
+            f"[LEVEL] {size} words: {sum(map(len, support.values()))} phrases, "
+            f"{sum(map(len, frequent.values()))} in at least {min_ids} tinyIds",
+            2,
         )
 
+        next_starts: List[Sequence[int]] = []
+        # texts in the order of their first field, so the first text a phrase
+        # is seen in holds its first occurrence
+        for (path, _, field, first), positions, keys in zip(texts, starts, text_keys):
+            path_frequent, path_seen = frequent.get(path, ()), seen[path]
+            is_frequent = [key in path_frequent for key in keys]
+            for i, key, flag in zip(positions, keys, is_frequent):
+                if flag and key not in path_seen:
+                    path_seen.add(key)
+                    ngrams.add_span(key, field, i, size)
+                    found[path].append(
+                        (first, size, i, key, support[path][key], values[path].get(key))
+                    )
+            next_starts.append(
+                [
+                    positions[j]
+                    for j in range(len(keys) - 1)
+                    if is_frequent[j] and is_frequent[j + 1] and positions[j + 1] == positions[j] + 1
+                ]
+            )
+        starts = next_starts
+        size += 1
+
+    for path, phrases in found.items():
+        phrases.sort(key=lambda phrase: phrase[:3])
+        path_results = final_result[path]
+        for _, _, _, key, members, path_values in phrases:
+            path_results[key] = members
+            if verbatim_map is not None:
+                verbatim_map[path][key] = path_values
+    return ngrams, final_result, verbatim_map
+
+
+def phrase_output(
+    maps: PhraseMaps, min_ids: int = 2, prune: str = "none", verbatim: bool = False
+) -> Dict[str, Dict[str, List[str]]]:
+    """Filter and prune collected phrases into collect_all_phrase_occurrences' output."""
+    ngrams, final_result, verbatim_map = maps
+
     # Post-process to convert sets to sorted lists and apply filtering
     if verbatim:
         output: Dict[str, Dict[str, Dict[str, List[str]]]] = {}  # type: ignore
     else:
         output: Dict[str, Dict[str, List[str]]] = {}
-    for path, phrase_map in final_result.items():
+    for path, ngram_map in final_result.items():
+        # Phrase text is only needed for phrases that can reach the output;
+        # pruning compares all of them.
+        keep_all = prune in ("tinyid", "global") or min_ids <= 1
+        tiny_ids = ngrams.tiny_ids.values
+        texts: Dict[int, str] = {}
+        phrase_map: Dict[str, Set[str]] = {}
+        for key, members in ngram_map.items():
+            if not keep_all and type(members) is int:
+                continue
+            ids = {tiny_ids[i] for i in members_of(members)}
+            if keep_all or len(ids) >= min_ids:
+                texts[key] = ngrams.text(key)
+                phrase_map[texts[key]] = ids
         if prune == "tinyid":
             phrase_map = prune_subphrases_by_tinyid(phrase_map)
         if prune == "global":
@@ -71,21 +444,20 @@ def collect_all_phrase_occurrences(
 
         if filtered:
             output[path] = filtered
-            pruned = {
-                phrase: sorted(ids)
-                for phrase, ids in phrase_map.items()
-                if len(ids) >= min_ids
-            }
-        if pruned:
-            output[path] = pruned
 
         if verbatim:
+            sources = ngrams.sources.values
+            verbatim_phrases = {
+                texts[key]: {sources[i] for i in members_of(members)}
+                for key, members in verbatim_map.get(path, {}).items()  # type: ignore[union-attr]
+                if key in texts
+            }
             #                for path, lemma_dict in phrase_map.items():
             for lemma_phrase, tinyids in phrase_map.items():
                 log_message = f"OUTPUT: lemma phrase {lemma_phrase}"
                 log_if_verbose(log_message, 3)
                 for verbatim_phrase in (
-                    verbatim_map.get(path, {}).get(lemma_phrase, []) or []
+                    verbatim_phrases.get(lemma_phrase, []) or []
                 ):
                     log_message = f"OUTPUT: verbatim phrase {verbatim_phrase}"
                     log_if_verbose(log_message, 3)
@@ -1,12 +1,12 @@
-import json
 import csv
 import re
-from typing import Any, List, Tuple, Type
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Type
 from pydantic import BaseModel
 from CDE_Schema import CDEItem, CDEForm
 import logging
 from utils.logger import log_if_verbose
 from utils.analyzer_state import get_verbosity
+from utils import json_backend
 
 logger = logging.getLogger(__name__)
 verbosity = get_verbosity()
@@ -15,7 +15,7 @@ verbosity = get_verbosity()
 def load_phrase_map(filepath: str) -> List[Tuple[str, str]]:
     if filepath.endswith(".json"):
         with open(filepath) as f:
-            data = json.load(f)
+            data = json_backend.load(f)
         return [(item["path"], item["phrase"]) for item in data]
     else:
         with open(filepath, newline="", encoding="utf-8") as f:
@@ -170,9 +170,8 @@ def _strip_in_place(container: Any, key_or_index: Any, phrase: str):
 
 
 def strip_phrases(
-    model_list: List[BaseModel], phrase_map: List[Tuple[str, str]]
-) -> List[BaseModel]:
-    cleaned_models = []
+    model_list: Iterable[BaseModel], phrase_map: List[Tuple[str, str]]
+) -> Iterator[BaseModel]:
     i = 1
     for model in model_list:
         data = model.model_dump(mode="python", exclude_none=False)
@@ -184,6 +183,12 @@ def strip_phrases(
             log_if_verbose(log_message, 3)
             traverse_and_replace_phrase(data, path, phrase)
             # delete_phrase_at_path(data, path, phrase)
-        cleaned = model.__class__.model_validate(data)
-        cleaned_models.append(cleaned)
-    return cleaned_models
+        yield model.__class__.model_validate(data)
+
+
+def strip_phrases_dumped(
+    model_list: Iterable[BaseModel], phrase_map: List[Tuple[str, str]]
+) -> Iterator[Dict[str, Any]]:
+    """`strip_phrases`, dumping each cleaned model to a JSON-compatible dict."""
+    for model in strip_phrases(model_list, phrase_map):
+        yield model.model_dump(mode="json")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark the count backends: the per-leaf visitor over validated models and
+the vectorized backend over an export_columnar Parquet table.
+
+Times each end to end (loading included) and the counting step alone, checks
+the two produce identical results, and exports the table first if --table
+doesn't exist yet. Run from the cde_analyzer directory, e.g.
+
+    python scripts/bench_count.py --input cde_export.json --table cde_export.parquet \\
+        --fields permissibleValue valueMeaningName --count-type --group-by stewardOrg --group-type path
+"""
+
+import os
+import sys
+import time
+import argparse
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from CDE_Schema import CDEItem
+from logic.columnar import export_columnar, read_columnar
+from logic.counter import CountQuery, count_queries, count_queries_columnar
+from utils.cde_impexport import iter_models
+
+
+def timed(func, repeat):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark count backends.")
+    parser.add_argument("--input", required=True, help="CDE JSON export.")
+    parser.add_argument("--table", required=True, help="Parquet table (created if missing).")
+    parser.add_argument("--fields", nargs="+", default=["permissibleValue"])
+    parser.add_argument("--match-type", default="non_null")
+    parser.add_argument("--value")
+    parser.add_argument("--group-by")
+    parser.add_argument("--group-type", default="top")
+    parser.add_argument("--count-type", action="store_true")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.table):
+        export_columnar(iter_models(args.input, CDEItem), args.table)
+
+    def query():
+        return CountQuery(
+            args.fields,
+            match_type=args.match_type,
+            value_match=args.value,
+            group_by=args.group_by,
+            group_type=args.group_type,
+            count_type=args.count_type,
+        )
+
+    models = list(iter_models(args.input, CDEItem))
+    table = read_columnar(args.table)
+    rows = [
+        ("visitor, load + count", lambda: count_queries(iter_models(args.input, CDEItem), [query()])),
+        ("visitor, count only", lambda: count_queries(models, [query()])),
+        ("columnar, read + count", lambda: count_queries_columnar(read_columnar(args.table), [query()], CDEItem)),
+        ("columnar, count only", lambda: count_queries_columnar(table, [query()], CDEItem)),
+    ]
+    results = []
+    print(f"{len(models)} items, {table.num_rows} leaf rows\n")
+    for label, func in rows:
+        elapsed, result = timed(func, args.repeat)
+        results.append(result)
+        print(f"{label:<26} {elapsed:9.3f} s")
+    same = all(repr(r) == repr(results[0]) for r in results)
+    print(f"\nresults identical: {same}")
+
+
+if __name__ == "__main__":
+    main()
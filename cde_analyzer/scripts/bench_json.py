@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark the JSON backends (stdlib json vs orjson) on a CDE/Form export.
+
+Times what the actions spend their serialization on: parsing the whole file,
+dumping the full list with indent=2 (strip_phrases --diff does this twice,
+strip_html and the json writers once) and dumping one compact line per item
+(the jsonl writers). Run from the cde_analyzer directory, e.g.
+
+    python scripts/bench_json.py --input cde_export.json
+"""
+
+import os
+import sys
+import time
+import argparse
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from utils import json_backend
+from utils.compression import open_file
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON backends.")
+    parser.add_argument("--input", required=True, help="JSON export to load.")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N runs.")
+    args = parser.parse_args()
+
+    with open_file(args.input) as f:
+        text = f.read()
+    backends = ["json"] + (["orjson"] if json_backend.orjson is not None else [])
+
+    results = {}
+    for name in backends:
+        json_backend.set_json_backend(name)
+        items = json_backend.loads(text)
+        results[name] = {
+            "loads": timed(lambda: json_backend.loads(text), args.repeat),
+            "dumps indent=2": timed(lambda: json_backend.dumps(items, indent=2), args.repeat),
+            "dumps per item": timed(
+                lambda: [json_backend.dumps(item) for item in items], args.repeat
+            ),
+        }
+
+    print(f"{len(items)} items, {len(text) / 1e6:.1f} MB\n")
+    print(f"{'':<16}" + "".join(f"{name:>12}" for name in backends))
+    for task in results["json"]:
+        row = "".join(f"{results[name][task]:11.3f}s" for name in backends)
+        if len(backends) > 1:
+            row += f"   {results['json'][task] / results['orjson'][task]:5.1f}x"
+        print(f"{task:<16}{row}")
+
+
+if __name__ == "__main__":
+    main()
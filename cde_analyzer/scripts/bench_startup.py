@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Benchmark CLI start-up: `cde_analyzer.py --help` and `<action> --help` for
+every action, each in a fresh interpreter, best of N. Start-up is what short
+runs (fix_underscores on a small file, count against a warm cache) pay on
+top of their work. Run from the cde_analyzer directory, e.g.
+
+    python scripts/bench_startup.py --repeat 5
+    python scripts/bench_startup.py --cli /path/to/other/checkout/cde_analyzer.py
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from cde_analyzer import ACTIONS
+
+
+def timed(argv, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI start-up time.")
+    parser.add_argument(
+        "--cli",
+        default=os.path.join(project_root, "cde_analyzer.py"),
+        help="cde_analyzer.py to run (default: this checkout's).",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Best of N runs.")
+    args = parser.parse_args()
+
+    baseline = timed([sys.executable, "-c", "pass"], args.repeat)
+    print(f"{'python -c pass':<24} {baseline:7.3f} s")
+    for command in [[]] + [[name] for name in ACTIONS]:
+        elapsed = timed([sys.executable, args.cli, *command, "--help"], args.repeat)
+        label = " ".join(command + ["--help"])
+        print(f"{label:<24} {elapsed:7.3f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# ------------------------------
+# File: tests/fixtures.py
+# ------------------------------
+# A small stand-in for the CDE schema, shared by the counting, columnar and
+# phrase tests: answers with permissible values, a nested question, a
+# recursive tree, designations and a few plain scalar and list fields.
+from typing import Any, Dict, List, Optional, Union
+from pydantic import BaseModel
+
+
+class Answer(BaseModel):
+    permissibleValue: Optional[str] = None
+    valueMeaningName: Optional[str] = None
+    score: Optional[Union[int, float]] = None
+
+
+class Question(BaseModel):
+    datatype: Optional[str] = None
+    answers: List[Answer] = []
+    extra: Optional[Dict[str, Any]] = None
+
+
+class Node(BaseModel):
+    name: str
+    children: List["Node"] = []
+
+
+class Designation(BaseModel):
+    designation: Optional[str] = None
+
+
+class Item(BaseModel):
+    tinyId: Optional[str] = None
+    flag: Optional[bool] = None
+    steward: Optional[str] = None
+    definition: Optional[str] = None
+    designations: List[Designation] = []
+    answers: List[Answer] = []
+    question: Optional[Question] = None
+    tags: List[Union[str, int]] = []
+    tree: Optional[Node] = None
+    matrix: List[List[int]] = []
+
+
+def raw_item(tiny_id, steward=None, values=(), definition=None, designations=()):
+    """An unvalidated Item dict, with one answer per permissible value in `values`."""
+    return {
+        "tinyId": tiny_id,
+        "steward": steward,
+        "definition": definition,
+        "designations": [{"designation": d} for d in designations],
+        "answers": [{"permissibleValue": v} for v in values],
+    }
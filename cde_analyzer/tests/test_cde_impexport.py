@@ -0,0 +1,209 @@
+# ------------------------------
+# File: tests/test_cde_impexport.py
+# ------------------------------
+import io
+import json
+import os
+import tempfile
+import unittest
+from typing import List, Optional
+from pydantic import BaseModel
+from utils.cde_impexport import (
+    iter_json,
+    iter_json_array,
+    iter_json_lines,
+    is_json_array,
+    is_jsonl_path,
+    map_models,
+)
+from utils.output_writer import write_json_array, write_jsonl
+from utils import json_backend
+
+SAMPLE = [
+    {"tinyId": "a1", "designations": [{"designation": "Sex [x]", "tags": []}]},
+    {"tinyId": "b2", "views": 12345, "history": ["h1", "h2"]},
+    123456789,
+    "plain string, with comma",
+    None,
+]
+
+
+
+class Item(BaseModel):
+    tinyId: Optional[str] = None
+    tags: List[int] = []
+
+
+def tag_totals(items):
+    for item in items:
+        if item.tags:
+            yield item.tinyId, sum(item.tags)
+
+
+class TestIterJsonArray(unittest.TestCase):
+    def test_matches_json_load(self):
+        text = json.dumps(SAMPLE, indent=2)
+        self.assertEqual(list(iter_json_array(io.StringIO(text))), SAMPLE)
+
+    def test_tiny_chunks(self):
+        # Chunk boundaries fall inside keys, strings and numbers.
+        text = json.dumps(SAMPLE)
+        for size in (1, 2, 3, 7):
+            items = list(iter_json_array(io.StringIO(text), chunk_size=size))
+            self.assertEqual(items, SAMPLE)
+
+    def test_empty_array(self):
+        self.assertEqual(list(iter_json_array(io.StringIO(" [ ] "))), [])
+
+    def test_single_object(self):
+        text = '{"tinyId": "a1"}'
+        self.assertEqual(list(iter_json_array(io.StringIO(text))), [{"tinyId": "a1"}])
+
+    def test_json_lines(self):
+        objs = [o for o in SAMPLE if isinstance(o, dict)]
+        text = "\n".join(json.dumps(o) for o in objs) + "\n\n"
+        for size in (3, 1 << 16):
+            items = list(iter_json_array(io.StringIO(text), chunk_size=size))
+            self.assertEqual(items, objs)
+        self.assertEqual(list(iter_json_lines(io.StringIO(text))), objs)
+
+    def test_truncated(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO('[{"a": 1}, {"b"')))
+
+
+class TestWriteJsonArray(unittest.TestCase):
+    def setUp(self):
+        self._backend = json_backend.get_json_backend()
+        json_backend.set_json_backend("json")
+
+    def tearDown(self):
+        json_backend.set_json_backend(self._backend)
+
+    def _roundtrip(self, data):
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            write_json_array(iter(data), path)
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        finally:
+            os.remove(path)
+
+    def test_same_as_dumps(self):
+        self.assertEqual(self._roundtrip(SAMPLE), json.dumps(SAMPLE, indent=2))
+
+    def test_empty(self):
+        self.assertEqual(self._roundtrip([]), json.dumps([], indent=2))
+
+    def test_compact(self):
+        fd, path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        try:
+            write_json_array(iter(SAMPLE), path, indent=None)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), json.dumps(SAMPLE))
+        finally:
+            os.remove(path)
+
+
+@unittest.skipIf(json_backend.orjson is None, "orjson not installed")
+class TestOrjsonBackend(unittest.TestCase):
+    def setUp(self):
+        self._backend = json_backend.get_json_backend()
+        json_backend.set_json_backend("orjson")
+
+    def tearDown(self):
+        json_backend.set_json_backend(self._backend)
+
+    def test_same_values(self):
+        data = SAMPLE + [{"unit": "\u00b5g", "big": 2**70, 1: "int key"}, 1e-05]
+        for indent in (None, 2):
+            text = json_backend.dumps(data, indent=indent)
+            self.assertEqual(json.loads(text), json.loads(json.dumps(data)))
+            self.assertEqual(json_backend.loads(text.encode()), json.loads(text))
+
+    def test_indent_matches_stdlib(self):
+        self.assertEqual(json_backend.dumps(SAMPLE, indent=2), json.dumps(SAMPLE, indent=2))
+
+
+class TestAtomicOutput(unittest.TestCase):
+    def test_error_leaves_no_partial_file(self):
+        def items():
+            yield from SAMPLE
+            raise ValueError("invalid item")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            fresh = os.path.join(tmp, "fresh.json.gz")
+            kept = os.path.join(tmp, "kept.jsonl")
+            write_jsonl(SAMPLE[:1], kept)
+            with self.assertRaises(ValueError):
+                write_json_array(items(), fresh)
+            with self.assertRaises(ValueError):
+                write_jsonl(items(), kept)
+            self.assertEqual(os.listdir(tmp), ["kept.jsonl"])
+            self.assertEqual(list(iter_json(kept)), SAMPLE[:1])
+
+    def test_device_written_in_place(self):
+        self.assertEqual(write_jsonl(SAMPLE, os.devnull), len(SAMPLE))
+
+
+class TestWriteJsonl(unittest.TestCase):
+    def test_append(self):
+        fd, path = tempfile.mkstemp(suffix=".jsonl")
+        os.close(fd)
+        try:
+            write_jsonl(SAMPLE[:2], path)
+            write_jsonl(SAMPLE[2:], path, append=True)
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(list(iter_json_lines(f)), SAMPLE)
+        finally:
+            os.remove(path)
+
+
+class TestCompressed(unittest.TestCase):
+    def test_roundtrip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for ext in (".gz", ".bz2", ".xz"):
+                array = os.path.join(tmp, "items.json" + ext)
+                lines = os.path.join(tmp, "items.jsonl" + ext)
+                write_json_array(iter(SAMPLE), array)
+                write_jsonl(SAMPLE, lines)
+                self.assertEqual(list(iter_json(array)), SAMPLE)
+                self.assertEqual(list(iter_json(lines)), SAMPLE)
+
+    def test_jsonl_detection(self):
+        self.assertTrue(is_jsonl_path("cde.jsonl.gz"))
+        self.assertTrue(is_jsonl_path("cde.ndjson.zst"))
+        self.assertFalse(is_jsonl_path("cde.json.xz"))
+
+    def test_array_detection(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            array = os.path.join(tmp, "items.json.gz")
+            lone = os.path.join(tmp, "item.json")
+            lines = os.path.join(tmp, "items.jsonl")
+            write_json_array(iter(SAMPLE), array)
+            with open(lone, "w") as f:
+                f.write("\n " * 5000 + '{"tinyId": "a1"}')
+            write_jsonl(SAMPLE, lines)
+            self.assertTrue(is_json_array(array))
+            self.assertFalse(is_json_array(lone))
+            self.assertFalse(is_json_array(lines))
+
+
+
+class TestMapModels(unittest.TestCase):
+    def test_workers_match_serial(self):
+        # enough items to go past imap_chunks' in-process probe to the pool
+        items = [{"tinyId": f"t{n}", "tags": list(range(n % 4))} for n in range(100)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "items.jsonl")
+            write_jsonl(items, path)
+            serial = list(map_models(path, Item, tag_totals))
+            pooled = list(map_models(path, Item, tag_totals, workers=2))
+        self.assertEqual(len(serial), 75)
+        self.assertEqual(pooled, serial)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# ------------------------------
+# File: tests/test_columnar.py
+# ------------------------------
+import os
+import tempfile
+import unittest
+from importlib.util import find_spec
+from core.recursor import recursive_descent
+from fixtures import Answer, Item
+from logic.columnar import COLUMNS, export_columnar, leaf_value, read_columnar
+from logic.counter import CountQuery, count_queries, count_queries_columnar
+
+
+ITEMS = [
+    Item(
+        tinyId="a1",
+        flag=False,
+        answers=[Answer(permissibleValue="Yes", score=1), Answer(permissibleValue="", score=0.5)],
+        matrix=[[1, 2], [], [3]],
+    ),
+    Item(tinyId=None, answers=[Answer()]),
+]
+
+
+@unittest.skipIf(find_spec("pyarrow") is None, "pyarrow not installed")
+class TestExportColumnar(unittest.TestCase):
+    def test_error_leaves_no_file(self):
+        def models():
+            yield ITEMS[0]
+            raise ValueError("invalid item")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.assertRaises(ValueError):
+                export_columnar(models(), os.path.join(tmp, "items.parquet"))
+            self.assertEqual(os.listdir(tmp), [])
+
+    def test_rows_match_leaves(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "items.parquet")
+            n = export_columnar(ITEMS, out, batch_rows=3)
+            table = read_columnar(out)
+        self.assertEqual(table.column_names, COLUMNS)
+        self.assertEqual(table.num_rows, n)
+
+        expected = []
+        for i, item in enumerate(ITEMS):
+            recursive_descent(
+                item.model_dump(),
+                path="",
+                visitor=lambda p, v, c, i=i, t=item.tinyId: expected.append((i, t, p, v)),
+            )
+        rows = table.to_pylist()
+        self.assertEqual(
+            [(r["item"], r["tinyId"], r["path"], leaf_value(r["value"], r["type"])) for r in rows],
+            expected,
+        )
+        # the flag/bool and int/float survive the round trip with their types
+        self.assertIs(leaf_value(rows[1]["value"], rows[1]["type"]), False)
+        matrix = [r for r in rows if r["path"] == "matrix.*.*"]
+        self.assertEqual([r["indices"] for r in matrix], [[0, 0], [0, 1], [2, 0]])
+
+    def test_count_backends_agree(self):
+        specs = [
+            dict(field_names=["permissibleValue", "score"], count_type=True, char_limit=2),
+            dict(field_names=["*"], match_type="null", group_by="tinyId"),
+            dict(field_names=["flag", "score"], group_by="tinyId", group_type="terminal"),
+            dict(field_names=["permissibleValue"], match_type="fixed", value_match="Yes"),
+            dict(field_names=["matrix.*.*", "flag"], match_type="regex", value_match="^[1F]"),
+            dict(field_names=["permissibleValue", "flag"], logic_expr="flag and not permissibleValue"),
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "items.parquet")
+            export_columnar(ITEMS, out)
+            table = read_columnar(out)
+        for spec in specs:
+            expected = count_queries(ITEMS, [CountQuery(**spec)])[0]
+            got = count_queries_columnar(table, [CountQuery(**spec)], Item)[0]
+            # same counts and the same key order, so the JSON output matches too
+            self.assertEqual(repr(got), repr(expected), spec)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+# ------------------------------
+# File: tests/test_count_state.py
+# ------------------------------
+import os
+import tempfile
+import unittest
+from fixtures import Item, raw_item
+from logic.count_state import CountState
+from logic.counter import CountQuery, count_queries
+
+
+SPECS = [
+    dict(field_names=["permissibleValue"], count_type=True, group_by="steward"),
+    dict(field_names=["steward", "permissibleValue"], logic_expr="steward and not permissibleValue"),
+]
+
+
+RELEASE_1 = [
+    raw_item("a", "NCI", ["Yes", "No"]),
+    raw_item("b", "NCI", ["1", "2"]),
+    raw_item("c", "NINDS"),
+    raw_item("b", "NIDA", ["Yes"]),  # repeated tinyId
+    raw_item(None, None, [""]),
+]
+RELEASE_2 = [
+    raw_item("a", "NCI", ["Yes", "No"]),  # unchanged
+    raw_item("b", "NCI", ["1", "2", "3"]),  # changed
+    raw_item("d", "NIDA", ["Maybe"]),  # added; c and the second b are removed
+    raw_item(None, None, [""]),
+]
+
+
+class TestCountState(unittest.TestCase):
+    def _recount(self, raw):
+        queries = [CountQuery(**spec) for spec in SPECS]
+        return count_queries([Item.model_validate(obj) for obj in raw], queries)
+
+    def _update(self, path, raw, specs=SPECS):
+        queries = [CountQuery(**spec) for spec in specs]
+        with CountState(path, queries, Item) as state:
+            stats = state.update(raw)
+        return [q.results for q in queries], stats
+
+    def test_delta_matches_recount(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.db")
+            results, stats = self._update(path, RELEASE_1)
+            self.assertEqual(repr(results), repr(self._recount(RELEASE_1)))
+            self.assertEqual(stats["added"], 5)
+
+            results, stats = self._update(path, RELEASE_2)
+            self.assertEqual(results, self._recount(RELEASE_2))
+            self.assertEqual(
+                stats, {"added": 1, "changed": 1, "removed": 2, "unchanged": 2}
+            )
+
+            _, stats = self._update(path, RELEASE_2)
+            self.assertEqual(stats["unchanged"], 4)
+
+    def test_other_queries_rebuild(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "state.db")
+            self._update(path, RELEASE_1)
+            specs = [dict(field_names=["tinyId"])]
+            results, stats = self._update(path, RELEASE_2, specs)
+            self.assertEqual(stats["added"], 4)
+            self.assertEqual(results, [{"tinyId": {"<global>": 3}}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,245 @@
+# ------------------------------
+# File: tests/test_counter.py
+# ------------------------------
+import os
+import re
+import tempfile
+import unittest
+from argparse import ArgumentParser
+from core.recursor import iter_leaves, recursive_descent, schema_prune_plan
+from fixtures import Answer, Item, Node, Question
+from itertools import product
+from logic.counter import (
+    CountQuery,
+    FieldMatcher,
+    TypeClassifier,
+    classify_type,
+    compile_logic,
+    count_matching_fields,
+    count_queries,
+    count_queries_sharded,
+    find_group_value,
+)
+from actions.count import load_queries, register_subparser
+from utils.datatype_check import check_number_type
+from utils.helpers import safe_nested_increment
+
+PATHS = [
+    "tinyId",
+    "designations.*.designation",
+    "designations.*.tags.*",
+    "valueDomain.permissibleValues.*.permissibleValue",
+    "valueDomain.permissibleValues.*.valueMeaningName",
+    "valueDomain.datatype",
+    "stewardOrg.name",
+    "classification.*.elements.*.name",
+]
+
+
+def reference_key(field_names, path):
+    """The per-leaf matching count_matching_fields used to do."""
+    base_name = path.split(".")[-1]
+    matched = any(
+        fn == path
+        or fn == base_name
+        or ("*" in fn and re.fullmatch(fn.replace("*", ".*"), path))
+        for fn in field_names
+    )
+    if not matched:
+        return None
+    return path if path in field_names else base_name
+
+
+class TestFieldMatcher(unittest.TestCase):
+    def test_matches_reference(self):
+        specs = [
+            ["permissibleValue"],
+            ["stewardOrg.name", "designation"],
+            ["designations.*"],
+            ["valueDomain.*.permissibleValue", "name"],
+            ["classification.*.name", "tinyId"],
+            ["*"],
+        ]
+        for field_names in specs:
+            matcher = FieldMatcher(field_names)
+            for _ in range(2):  # second pass is served from the memo
+                for path in PATHS:
+                    self.assertEqual(
+                        matcher.key(path), reference_key(field_names, path), (field_names, path)
+                    )
+
+
+def reference_number_type(s):
+    """The float()/int() parsing check_number_type used to do."""
+    try:
+        f_val = float(s)
+        try:
+            return True, f_val == int(s)
+        except ValueError:
+            return True, False
+    except ValueError:
+        return False, None
+
+
+class TestTypeClassifier(unittest.TestCase):
+    VALUES = [
+        "1", " 1 ", "+1", "-0", "1_000", "1__0", "_1", "1.", "1.5", ".5", ".", "1e5", "1E-5",
+        "1e", "1._5", "1e1_0", "inf", "-Infinity", "nAn ", "infinit", "\u0663", "1 2", "", "0x1a",
+        "Yes", "No", "12345678901234567891", "9" * 400, 0, 1, True, False, 2.5, 1.0, None,
+    ]
+
+    def test_number_type_matches_parsing(self):
+        for value in self.VALUES:
+            if value is not None:
+                self.assertEqual(check_number_type(value), reference_number_type(value), repr(value))
+
+    def test_memo_matches_classify_type(self):
+        classifier = TypeClassifier(3)
+        values = self.VALUES * 2  # second round is served from the memo
+        expected = [classify_type(v, 3) for v in values]
+        self.assertEqual(classifier.classify_many(values), expected)
+        self.assertEqual([classifier.classify(v) for v in values], expected)
+        # equal but differently typed values keep their own label
+        mixed = ["1", 1, 1.0, True, 1.5]
+        self.assertEqual(classifier.classify_many(mixed), [classify_type(v, 3) for v in mixed])
+
+
+class TestCompileLogic(unittest.TestCase):
+    def test_truth_table(self):
+        exprs = ["A", "not A", "A and not B", "A or B and C", "not (A or B) or C", "A and B and C"]
+        for expr in exprs:
+            logic = compile_logic(expr)
+            for values in product([0, 1, 3], repeat=3):
+                flat = dict(zip("ABC", values))
+                self.assertEqual(logic(flat), bool(eval(expr, {}, flat)), (expr, flat))
+
+    def test_missing_and_dotted_names(self):
+        self.assertFalse(compile_logic("A")({}))
+        self.assertTrue(compile_logic("A or B")({"A": 1}))
+        self.assertTrue(compile_logic("stewardOrg.name and not tinyId")({"stewardOrg.name": 2}))
+
+    def test_rejects_code(self):
+        for expr in ("__import__('os').system('true')", "A + B", "A == 1", "A(", "lambda: A", "A[0]"):
+            with self.assertRaises(ValueError, msg=expr):
+                compile_logic(expr)
+
+
+ITEMS = [
+    Item(
+        tinyId="a1",
+        question=Question(
+            datatype="Value List",
+            answers=[Answer(permissibleValue="Yes"), Answer(permissibleValue="", valueMeaningName="No")],
+            extra={"permissibleValue": "hidden", "n": [1, {"name": "x"}]},
+        ),
+        tags=["t", 1],
+        tree=Node(name="root", children=[Node(name="leaf")]),
+    ),
+    Item(tinyId="b2"),
+]
+
+
+class TestIterLeaves(unittest.TestCase):
+    def _reference(self, data):
+        leaves = []
+        recursive_descent(data, path="", visitor=lambda p, v, c: leaves.append((p, v)))
+        return leaves
+
+    def test_matches_recursive_descent(self):
+        for item in ITEMS:
+            data = item.model_dump()
+            self.assertEqual(list(iter_leaves(data)), self._reference(data))
+        self.assertEqual(list(iter_leaves(5)), [("", 5)])
+
+    def test_pruned_keeps_matching_leaves(self):
+        for fields in (["permissibleValue"], ["name"], ["question.*"], ["tinyId", "tags.*"]):
+            matcher = FieldMatcher(fields)
+            plan = schema_prune_plan(Item, lambda p: matcher.key(p) is not None)
+            for item in ITEMS:
+                data = item.model_dump()
+                full = [(p, v) for p, v in self._reference(data) if matcher.key(p)]
+                pruned = [(p, v) for p, v in iter_leaves(data, plan) if matcher.key(p)]
+                self.assertEqual(pruned, full, fields)
+
+    def test_prunes_unrelated_subtrees(self):
+        plan = schema_prune_plan(Item, lambda p: p.split(".")[-1] == "permissibleValue")
+        # the scalar fields and tags can't match; the recursive Node model is walked in full
+        self.assertEqual(list(plan), ["answers", "question", "tree"])
+        self.assertNotIn("datatype", plan["question"])
+        self.assertIn("extra", plan["question"])  # open-ended dict is walked
+
+
+class TestCountMatchingFields(unittest.TestCase):
+    def test_prune_same_counts(self):
+        for fields in (["permissibleValue"], ["name", "tinyId"], ["question.*"]):
+            for kwargs in ({}, {"count_type": True}, {"match_type": "null"}):
+                self.assertEqual(
+                    count_matching_fields(ITEMS, fields, prune=True, **kwargs),
+                    count_matching_fields(ITEMS, fields, prune=False, **kwargs),
+                )
+
+    def test_group_value_from_same_traversal(self):
+        fields = ["permissibleValue", "tinyId"]
+        for group_by, group_type in (("tinyId", "top"), ("name", "terminal"), ("tree", "path")):
+            expected = {}
+            for item in ITEMS:
+                group = find_group_value(item.model_dump(), group_by, group_type)
+                for key, groups in count_matching_fields([item], fields).items():
+                    safe_nested_increment(expected, key, group, v=groups["<global>"])
+            for prune in (True, False):
+                self.assertEqual(
+                    count_matching_fields(
+                        ITEMS, fields, group_by=group_by, group_type=group_type, prune=prune
+                    ),
+                    expected,
+                    (group_by, group_type),
+                )
+
+    def test_queries_share_one_pass(self):
+        specs = [
+            dict(field_names=["permissibleValue"]),
+            dict(field_names=["name"], group_by="name", group_type="terminal", count_type=True),
+            dict(field_names=["valueMeaningName", "datatype"], match_type="null"),
+            dict(field_names=["tags.*"], match_type="fixed", value_match="t", group_by="tinyId"),
+            dict(field_names=["permissibleValue", "tinyId"], logic_expr="tinyId and not permissibleValue"),
+        ]
+        results = count_queries(ITEMS, [CountQuery(**spec) for spec in specs])
+        for spec, result in zip(specs, results):
+            self.assertEqual(result, count_matching_fields(ITEMS, **spec), spec)
+
+    def test_sharded_matches_single_pass(self):
+        specs = [
+            dict(field_names=["name", "permissibleValue"], count_type=True, group_by="tinyId"),
+            dict(field_names=["tags.*"], group_by="name", group_type="terminal"),
+        ]
+        # enough items to go past imap_chunks' in-process probe to the pool
+        items = [Item(tinyId=f"{n % 7}", tags=[n % 3]) for n in range(40)] + ITEMS * 20
+        expected = count_queries(items, [CountQuery(**spec) for spec in specs])
+        raw = [item.model_dump() for item in items]
+        got = count_queries_sharded(raw, Item, [CountQuery(**spec) for spec in specs], workers=2)
+        self.assertEqual(repr(got), repr(expected))
+
+
+
+class TestLoadQueries(unittest.TestCase):
+    def load(self, text):
+        parser = ArgumentParser()
+        register_subparser(parser)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "queries.yaml")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            return load_queries(path, parser.parse_args(["--queries", path]))
+
+    def test_names(self):
+        queries = self.load("pv.types-2: {fields: permissibleValue}\n")
+        self.assertEqual([q.name for q in queries], ["pv.types-2"])
+
+    def test_rejects_path_names(self):
+        for name in ["../out", "a/b", "..", "'a\\\\b'", "''"]:
+            with self.assertRaises(ValueError, msg=name):
+                self.load(f"- name: {name}\n  fields: permissibleValue\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
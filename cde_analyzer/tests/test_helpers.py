@@ -2,7 +2,7 @@
 # File: tests/test_helpers.py
 # ------------------------------
 import unittest
-from utils.helpers import safe_nested_increment, flatten_nested_dict
+from utils.helpers import safe_nested_increment, flatten_nested_dict, merge_nested_counts
 
 
 class TestSafeNestedIncrement(unittest.TestCase):
@@ -30,6 +30,39 @@ class TestSafeNestedIncrement(unittest.TestCase):
         self.assertEqual(d["a"]["b"]["c"]["d"]["e"], 1)
 
 
+class TestMergeNestedCounts(unittest.TestCase):
+    INCREMENTS = [("a", "x", 1), ("b", "y", 2), ("a", "y", 3), ("c", "x", 1), ("a", "x", 4), ("b", "z", 1)]
+
+    def _count(self, increments):
+        d = {}
+        for *keys, v in increments:
+            safe_nested_increment(d, *keys, v=v)
+        return d
+
+    def test_shards_merge_to_single_pass(self):
+        expected = self._count(self.INCREMENTS)
+        for cut in range(len(self.INCREMENTS) + 1):
+            merged = merge_nested_counts(
+                self._count(self.INCREMENTS[:cut]), self._count(self.INCREMENTS[cut:])
+            )
+            self.assertEqual(merged, expected)
+            self.assertEqual(repr(merged), repr(expected))  # same key order
+
+    def test_associative(self):
+        a, b, c = (self._count(self.INCREMENTS[i::3]) for i in range(3))
+        left = merge_nested_counts(merge_nested_counts({}, a), b)
+        merge_nested_counts(left, c)
+        right = merge_nested_counts({}, a)
+        merge_nested_counts(right, merge_nested_counts(merge_nested_counts({}, b), c))
+        self.assertEqual(left, right)
+
+    def test_subtract_undoes_add(self):
+        base = self._count(self.INCREMENTS[:3])
+        extra = self._count(self.INCREMENTS[3:])
+        total = merge_nested_counts(self._count(self.INCREMENTS[:3]), extra)
+        self.assertEqual(merge_nested_counts(total, extra, sign=-1), base)
+
+
 class TestFlattenNestedDict(unittest.TestCase):
     def test_flatten_simple(self):
         d = {"a": {"b": 1}}
@@ -0,0 +1,139 @@
+# ------------------------------
+# File: tests/test_phrase_extraction.py
+# ------------------------------
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+import utils.phrase_extraction as phrase_extraction
+from utils.phrase_extraction import LRUCache, NGramIndex, add_distinct, add_member, members_of
+
+
+def reference_phrases(words, min_words, max_words=None):
+    """extract_phrases' enumeration on already tokenized words."""
+    longest = len(words) if max_words is None else min(len(words), max_words)
+    return [
+        " ".join(words[i : i + size])
+        for size in range(min_words, longest + 1)
+        for i in range(len(words) - size + 1)
+    ]
+
+
+class TestNGramIndex(unittest.TestCase):
+    def test_keys_follow_phrase_text(self):
+        rng = random.Random(0)
+        ngrams = NGramIndex()
+        key_of = {}
+        for _ in range(200):
+            words = [rng.choice("abcde") for _ in range(rng.randint(0, 12))]
+            for min_words, max_words in ((1, None), (2, 3), (3, 1)):
+                keys = ngrams.keys(words, min_words, max_words)
+                texts = reference_phrases(words, min_words, max_words)
+                self.assertEqual([ngrams.text(k) for k in keys], texts)
+                for key, text in zip(keys, texts):
+                    # one key per distinct phrase, across fields
+                    self.assertEqual(key_of.setdefault(text, key), key)
+        self.assertEqual(len(set(key_of.values())), len(key_of))
+
+    def test_members_keep_first_seen_order(self):
+        tiny, verbatim = {}, {}
+        for member in [5, 5, 2, 2, 7, 5]:  # one item at a time; 5 repeats later
+            add_member(tiny, "k", member)
+            add_distinct(verbatim, "k", member)
+        add_member(tiny, "one", 3)
+        self.assertEqual(members_of(tiny["k"]), [5, 2, 7])
+        self.assertEqual(members_of(verbatim["k"]), [5, 2, 7])
+        self.assertEqual(tiny["one"], 3)  # single members stay bare ints
+
+
+class TestRequireNltk(unittest.TestCase):
+    def test_offline_error_names_packages(self):
+        resources = {"missing": [("corpora/no_such_corpus", "no_such_corpus")]}
+        with mock.patch.dict(phrase_extraction.NLTK_RESOURCES, resources), mock.patch(
+            "nltk.download", return_value=False
+        ) as download:
+            for _ in range(2):
+                with self.assertRaisesRegex(LookupError, "nltk.downloader no_such_corpus"):
+                    phrase_extraction.require_nltk("missing")
+        self.assertEqual(download.call_count, 2)
+        self.assertNotIn("missing", phrase_extraction._verified_features)
+
+
+class TestWordCaches(unittest.TestCase):
+    def test_lru_eviction_and_stats(self):
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.get("a"), 1)  # "b" is now least recently used
+        cache.put("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        disabled = LRUCache(0)
+        disabled.put("a", 1)
+        self.assertIsNone(disabled.get("a"))
+
+    def test_tracked_entries_are_drained(self):
+        self.assertIsNone(phrase_extraction.drain_word_cache_entries())
+        phrase_extraction.init_word_caches(10, [("a", ("a",))], [(("dogs", "n"), "dog")], track=True)
+        self.assertEqual(phrase_extraction.words_cache.get("a"), ("a",))
+        phrase_extraction.words_cache.put("b", ("b",))
+        self.assertEqual(phrase_extraction.drain_word_cache_entries(), ([("b", ("b",))], []))
+        self.assertEqual(phrase_extraction.drain_word_cache_entries(), ([], []))
+        phrase_extraction.set_word_cache_size(phrase_extraction.DEFAULT_WORD_CACHE_SIZE)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "words.jsonl")
+            phrase_extraction.set_word_cache_size(10)
+            self.assertFalse(phrase_extraction.load_word_caches(path))
+            phrase_extraction.words_cache.put(("a b", False, True), ("a", "b"))
+            phrase_extraction.lemma_cache.put(("dogs", "n"), "dog")
+            phrase_extraction.save_word_caches(path)
+
+            phrase_extraction.set_word_cache_size(10)
+            self.assertTrue(phrase_extraction.load_word_caches(path))
+            self.assertEqual(phrase_extraction.words_cache.get(("a b", False, True)), ("a", "b"))
+            self.assertEqual(phrase_extraction.lemma_cache.get(("dogs", "n")), "dog")
+            self.assertEqual(os.listdir(tmp), ["words.jsonl"])
+        phrase_extraction.set_word_cache_size(phrase_extraction.DEFAULT_WORD_CACHE_SIZE)
+
+    def test_malformed_cache_is_ignored(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "words.jsonl")
+            phrase_extraction.set_word_cache_size(10)
+            phrase_extraction.save_word_caches(path)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write('["lemma", ["dogs", "n"], "dog"]\n["words", "a b", ["a", "b"]]\n')
+            self.assertFalse(phrase_extraction.load_word_caches(path))
+            self.assertIsNone(phrase_extraction.lemma_cache.get(("dogs", "n")))
+
+            with open(path, "wb") as f:
+                f.write(b"\x80\x05not json")
+            self.assertFalse(phrase_extraction.load_word_caches(path))
+        phrase_extraction.set_word_cache_size(phrase_extraction.DEFAULT_WORD_CACHE_SIZE)
+
+    def test_batch_tags_distinct_uncached_texts_once(self):
+        tagged = []
+
+        def tag_sents(sentences):
+            tagged.append(sentences)
+            return [[(w, "NN") for w in sentence] for sentence in sentences]
+
+        phrase_extraction.set_word_cache_size(10)
+        with (
+            mock.patch.object(phrase_extraction, "word_tokenizer", return_value=str.split),
+            mock.patch.object(phrase_extraction, "sentence_tagger", return_value=tag_sents),
+            mock.patch.object(phrase_extraction, "lemmatize_word", lambda w, pos: w.rstrip("s")),
+        ):
+            phrase_extraction.words_cache.put(("cached text", False, True), ("cached",))
+            texts = ["Blood tests", "blood tests", "-", "cached text", "Heart rates"]
+            words = phrase_extraction.phrase_words_many(texts, False, True)
+        self.assertEqual(words, [["blood", "test"], ["blood", "test"], [], ["cached"], ["heart", "rate"]])
+        self.assertEqual(tagged, [[["blood", "tests"], ["heart", "rates"]]])
+        phrase_extraction.set_word_cache_size(phrase_extraction.DEFAULT_WORD_CACHE_SIZE)
+
+
+if __name__ == "__main__":
+    unittest.main()
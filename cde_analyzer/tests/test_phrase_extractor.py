@@ -0,0 +1,125 @@
+# ------------------------------
+# File: tests/test_phrase_extractor.py
+# ------------------------------
+import random
+import unittest
+from collections import defaultdict
+from unittest import mock
+from fixtures import Item, raw_item
+import utils.phrase_extraction as phrase_extraction
+from utils.phrase_extraction import NGramIndex, record_phrases
+from logic.phrase_extractor import (
+    collect_all_phrase_occurrences,
+    collect_all_phrase_occurrences_sharded,
+    mine_phrase_maps,
+    phrase_output,
+)
+
+
+RAW_ITEMS = [
+    raw_item("a", definition="blood pressure reading", designations=["Blood pressure"]),
+    raw_item("b", definition="systolic blood pressure", designations=["blood pressure reading"]),
+    raw_item("c", definition="heart rate at rest", designations=["Heart rate", "blood pressure"]),
+    raw_item(None, definition="blood pressure reading"),  # skipped: no tinyId
+    raw_item("a", definition="heart rate at rest"),  # repeated tinyId
+    raw_item("d", definition="", designations=["rest heart rate"]),
+]
+
+
+class TestLevelWiseMining(unittest.TestCase):
+    def _fields(self, rng, n):
+        # few words and tinyIds, so that long phrases are shared
+        fields = []
+        for _ in range(n):
+            path = rng.choice(["definition", "designations.*.designation"])
+            value = " ".join(rng.choice("abcd") for _ in range(rng.randint(0, 10)))
+            fields.append((path, value, rng.randrange(12), value.split()))
+        return fields
+
+    def _all_phrases(self, fields, min_words, max_words, verbatim):
+        ngrams = NGramIndex()
+        results, values = defaultdict(dict), defaultdict(dict) if verbatim else None
+        for path, value, tiny_id, words in fields:
+            record_phrases(path, value, words, tiny_id, results, values, ngrams, min_words, max_words)
+        ngrams.tiny_ids.values = [f"T{i}" for i in range(12)]
+        return ngrams, results, values
+
+    def test_same_output_as_all_phrases(self):
+        rng = random.Random(0)
+        for _ in range(30):
+            fields = self._fields(rng, rng.randint(1, 40))
+            min_ids, min_words = rng.randint(2, 4), rng.randint(1, 3)
+            max_words = rng.choice([None, min_words, min_words + 2])
+            verbatim = rng.random() < 0.5
+            expected = phrase_output(
+                self._all_phrases(fields, min_words, max_words, verbatim), min_ids, verbatim=verbatim
+            )
+            ngrams = NGramIndex()
+            ngrams.tiny_ids.values = [f"T{i}" for i in range(12)]
+            mined = mine_phrase_maps(fields, ngrams, min_ids, min_words, max_words, verbatim)
+            got = phrase_output(mined, min_ids, verbatim=verbatim)
+            self.assertEqual(repr(got), repr(expected))
+
+
+class TestShardedPhrases(unittest.TestCase):
+    def setUp(self):
+        # whitespace tokenizing and a stand-in tagger, so no NLTK data is
+        # needed (fields nested in lists are always lemmatized)
+        def tag_sents(sentences):
+            return [[(w, "NN") for w in sentence] for sentence in sentences]
+
+        patches = [
+            mock.patch.object(phrase_extraction, "word_tokenizer", return_value=str.split),
+            mock.patch.object(phrase_extraction, "sentence_tagger", return_value=tag_sents),
+            mock.patch.object(phrase_extraction, "lemmatize_word", lambda w, pos: w),
+            mock.patch("logic.phrase_extractor.require_nltk"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        phrase_extraction.set_word_cache_size(0)
+        self.addCleanup(
+            phrase_extraction.set_word_cache_size, phrase_extraction.DEFAULT_WORD_CACHE_SIZE
+        )
+
+    def test_merged_shards_match_single_pass(self):
+        for options in [
+            dict(min_ids=2),
+            dict(min_ids=1, min_words=1, verbatim=True),
+            dict(min_ids=2, prune="global"),
+        ]:
+            options.update(
+                field_names=["definition", "designation"], lemmatize=False, remove_stopwords=False
+            )
+            expected = collect_all_phrase_occurrences(
+                [Item.model_validate(obj) for obj in RAW_ITEMS], **options
+            )
+            # one worker runs a chunk per item in this process: every item is a shard
+            got = collect_all_phrase_occurrences_sharded(RAW_ITEMS, Item, workers=1, **options)
+            self.assertEqual(repr(got), repr(expected), options)
+            self.assertTrue(got)
+
+    def test_workers_share_word_cache(self):
+        phrase_extraction.set_word_cache_size(1000)
+        # a cached entry the workers can only know about if it is handed over
+        phrase_extraction.words_cache.put(("seeded text", False, False), ("cached", "words"))
+        # enough items to go past imap_chunks' in-process probe to the pool
+        raw = RAW_ITEMS * 6 + [raw_item(f"t{n}", definition=f"word{n} shared text") for n in range(40)]
+        raw += [raw_item("x", definition="seeded text"), raw_item("y", definition="seeded text")]
+        options = dict(
+            field_names=["definition", "designation"],
+            lemmatize=False,
+            remove_stopwords=False,
+            min_ids=2,
+        )
+        got = collect_all_phrase_occurrences_sharded(raw, Item, workers=2, word_cache=True, **options)
+        self.assertIn("cached words", got["definition"])
+        # texts only seen by the workers come back to this process's cache
+        self.assertEqual(
+            phrase_extraction.words_cache.entries.get(("word39 shared text", False, False)),
+            ("word39", "shared", "text"),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
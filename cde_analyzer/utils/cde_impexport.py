@@ -1,14 +1,28 @@
+import sys
 import json
 import csv
+import hashlib
+import logging
+from argparse import ArgumentParser, Namespace
+from functools import lru_cache, partial
 from pathlib import Path
+from pydantic import BaseModel
 from CDE_Schema.CDE_Item import CDEItem
-from typing import Any, Type, List, Optional, Dict, Union
+from typing import Any, Callable, Type, List, Optional, Dict, Union, Iterable, Iterator, TextIO
+from utils.parallel import imap_chunks
+from utils.compression import open_file, strip_compression_suffix
+from utils import json_backend
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = " \t\n\r"
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
 
 
 def save_raw_json(model, base_filename, idx):
     raw_filename = f"{base_filename}_raw_{idx+1}.json"
     with open(raw_filename, "w", encoding="utf-8", newline="") as raw_file:
-        json.dump(model.dict(), raw_file, indent=2)
+        json_backend.dump(model.dict(), raw_file, indent=2)
     print(f"Raw JSON saved to {raw_filename}")
 
 
@@ -31,7 +45,7 @@ def export_results(results, output_format, filename):
         print(f"Results exported to {filename} in CSV format.")
     elif output_format == "json":
         with open(filename, "w", encoding="utf-8", newline="") as f:
-            json.dump(results, f, indent=2)
+            json_backend.dump(results, f, indent=2)
         print(f"Results exported to {filename} in JSON format.")
     else:
         print("Unsupported export format.")
@@ -54,10 +68,233 @@ def concatenate_values(data_list: list, delimiter: str = ", ") -> str:
 ## This is not quite right
 def load_json_model(file_path: str) -> List[CDEItem]:
     with open(file_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+        data = json_backend.load(f)
     return list(CDEItem)  # type: ignore
 
 
 def load_json(filepath: Path) -> Union[list, dict]:
-    with filepath.open("r", encoding="utf-8") as f:
-        return json.load(f)
+    with open_file(filepath) as f:
+        return json_backend.load(f)
+
+
+def iter_json_array(fp: TextIO, chunk_size: int = 1 << 16) -> Iterator[Any]:
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    Only the element currently being decoded (plus one read chunk) is held in
+    memory, so a full repository export never has to be resident as a list of
+    dicts. Input that does not start with `[` is read as a sequence of
+    whitespace-separated values, which covers both a lone object (mirroring
+    how `process_data` treats a single dict) and JSON Lines.
+    """
+    decoder = json.JSONDecoder()
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill(size: int) -> bool:
+        nonlocal buf, pos, eof
+        chunk = fp.read(size)
+        if not chunk:
+            eof = True
+            return False
+        buf = buf[pos:] + chunk
+        pos = 0
+        return True
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE:
+                pos += 1
+            if pos < len(buf) or not fill(chunk_size):
+                return
+
+    def decode() -> Any:
+        # A decode that ends at the buffer boundary may be a truncated scalar,
+        # so keep reading (doubling the request) until the value is followed by
+        # more input or the stream is exhausted.
+        nonlocal pos
+        size = chunk_size
+        while True:
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+                if end < len(buf) or eof:
+                    break
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            if not fill(size):
+                continue
+            size *= 2
+        pos = end
+        return obj
+
+    skip_ws()
+    if pos >= len(buf):
+        return
+    if buf[pos] != "[":
+        while pos < len(buf):
+            yield decode()
+            skip_ws()
+        return
+    pos += 1
+
+    expect_item = True
+    while True:
+        skip_ws()
+        if pos >= len(buf):
+            raise ValueError("Unexpected end of input inside JSON array.")
+        if buf[pos] == "]":
+            return
+        if not expect_item:
+            if buf[pos] != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {buf[pos]!r}")
+            pos += 1
+            expect_item = True
+            continue
+        expect_item = False
+        yield decode()
+
+
+def iter_json_lines(fp: TextIO) -> Iterator[Any]:
+    """Yield one value per non-blank line of a JSON Lines stream."""
+    for line in fp:
+        if line.strip():
+            yield json_backend.loads(line)
+
+
+def is_jsonl_path(filepath: Union[str, Path, None]) -> bool:
+    return strip_compression_suffix(str(filepath)).lower().endswith(JSONL_SUFFIXES)
+
+
+def is_stdio(filepath: Union[str, Path, None]) -> bool:
+    return str(filepath) == "-"
+
+
+def is_json_array(filepath: Union[str, Path]) -> bool:
+    """
+    Whether a JSON input holds a top-level array rather than a lone value or
+    JSON Lines. Only the first characters are read; standard input is peeked
+    without consuming it, and is assumed to be an array if it can't be.
+    """
+    if is_stdio(filepath):
+        peek = getattr(sys.stdin.buffer, "peek", None)
+        return peek is None or peek(1 << 16).lstrip()[:1] == b"["
+    if is_jsonl_path(filepath):
+        return False
+    with open_file(filepath) as f:
+        while True:
+            chunk = f.read(1 << 12)
+            head = chunk.lstrip(_WHITESPACE)
+            if head or not chunk:
+                return head[:1] == "["
+
+
+def iter_json(filepath: Union[str, Path]) -> Iterator[Any]:
+    """
+    Stream the top-level elements of a JSON array or JSON Lines file.
+    `-` reads standard input, where the format is detected from the content.
+    .gz/.bz2/.xz/.zst files are decompressed on the fly.
+    """
+    if is_stdio(filepath):
+        yield from iter_json_array(sys.stdin)
+        return
+    with open_file(filepath) as f:
+        if is_jsonl_path(filepath):
+            yield from iter_json_lines(f)
+        else:
+            yield from iter_json_array(f)
+
+
+def as_models(items: Iterable[Any], model_class: Type[BaseModel]) -> Iterator[BaseModel]:
+    """
+    Pass through items that already are `model_class` instances and validate
+    the rest (dicts, or dumps of other models), so in-process pipeline stages
+    only validate when the item type actually changes.
+    """
+    for item in items:
+        if isinstance(item, model_class):
+            yield item
+        else:
+            if isinstance(item, BaseModel):
+                item = item.model_dump(by_alias=True)
+            yield model_class.model_validate(item)
+
+
+def as_dicts(items: Iterable[Any]) -> Iterator[Any]:
+    """Dump model instances to JSON-compatible dicts; pass other items through."""
+    for item in items:
+        if isinstance(item, BaseModel):
+            yield item.model_dump(mode="json", by_alias=True)
+        else:
+            yield item
+
+
+def add_workers_argument(subparser: ArgumentParser):
+    """Register the --workers option shared by model-based actions."""
+    subparser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Validate and process input items in this many processes (default: 1).",
+    )
+
+
+@lru_cache(maxsize=None)
+def schema_fingerprint(model_class: Type[BaseModel]) -> str:
+    """Short hash of the model's JSON schema; changes whenever CDE_Schema does."""
+    schema = json.dumps(model_class.model_json_schema(), sort_keys=True)
+    return hashlib.sha256(schema.encode("utf-8")).hexdigest()[:16]
+
+
+def iter_models(
+    filepath: Union[str, Path], model_class: Type[BaseModel]
+) -> Iterator[BaseModel]:
+    """
+    Lazily validate the items of a JSON export into `model_class` instances.
+
+    Consumers that iterate once (count, phrase, extract_embed, strip_phrases)
+    keep peak memory bounded by a single item plus their own accumulators.
+    """
+    n = 0
+    for obj in iter_json(filepath):
+        n += 1
+        yield model_class.model_validate(obj)
+    logger.info(f"Validated {n} {model_class.__name__} items from {filepath}")
+
+
+def _map_chunk(
+    func: Callable[[Iterable[BaseModel]], Iterable[Any]],
+    model_class: Type[BaseModel],
+    objs: List[Any],
+) -> List[Any]:
+    return list(func(model_class.model_validate(obj) for obj in objs))
+
+
+def map_models(
+    filepath: Union[str, Path],
+    model_class: Type[BaseModel],
+    func: Callable[[Iterable[BaseModel]], Iterable[Any]],
+    workers: int = 1,
+) -> Iterator[Any]:
+    """
+    Yield `func(models)` over the validated items of a JSON export.
+
+    With `workers` > 1, chunks of raw items are validated and run through
+    `func` in a process pool, and only its results come back, in input order.
+    Returning models themselves would cost more to pickle than validating
+    them, so `func` should reduce each one to a dump or a row. It must be
+    picklable (a module-level function or a functools.partial of one) and
+    must not carry state from one chunk to the next.
+    """
+    if workers > 1:
+        return imap_chunks(
+            partial(_map_chunk, func, model_class), iter_json(filepath), workers
+        )
+    return iter(func(iter_models(filepath, model_class)))
+
+
+def models_from_args(args: Namespace, model_class: Type[BaseModel]) -> Iterator[BaseModel]:
+    """`iter_models` over the `--input` of an action."""
+    return iter_models(args.input, model_class)
@@ -0,0 +1,60 @@
+# ------------------------------
+# File: utils/compression.py
+# ------------------------------
+import bz2
+import gzip
+import lzma
+from pathlib import Path
+from typing import IO, Union
+
+# Compression is chosen by file extension. gzip, bz2 and xz use the standard
+# library; zstd needs the optional `zstandard` package (pip install zstandard).
+COMPRESSION_SUFFIXES = {
+    ".gz": "gzip",
+    ".bz2": "bz2",
+    ".xz": "xz",
+    ".zst": "zstd",
+}
+
+
+def compression_of(path: Union[str, Path]) -> Union[str, None]:
+    return COMPRESSION_SUFFIXES.get(Path(str(path)).suffix.lower())
+
+
+def strip_compression_suffix(path: Union[str, Path]) -> str:
+    """`data.jsonl.gz` -> `data.jsonl`, so format detection sees the inner type."""
+    path = str(path)
+    if compression_of(path):
+        return path[: -len(Path(path).suffix)]
+    return path
+
+
+def open_file(
+    path: Union[str, Path], mode: str = "r", encoding: Union[str, None] = "utf-8"
+) -> IO:
+    """
+    Open a possibly compressed file. Text modes decode `encoding` with
+    universal newlines disabled, like open(..., newline=""); reading and
+    writing both stream through the codec, so the uncompressed data is never
+    held in memory or written to disk.
+    """
+    binary = "b" in mode
+    kwargs = {} if binary else {"encoding": encoding, "newline": ""}
+    if not binary and "t" not in mode:
+        mode += "t"
+    codec = compression_of(path)
+    if codec is None:
+        return open(path, mode.replace("t", ""), **kwargs)
+    if codec == "gzip":
+        return gzip.open(path, mode, **kwargs)
+    if codec == "bz2":
+        return bz2.open(path, mode, **kwargs)
+    if codec == "xz":
+        return lzma.open(path, mode, **kwargs)
+    try:
+        import zstandard  # type: ignore
+    except ImportError:
+        raise ImportError(
+            f"Reading or writing {path} needs the zstandard package (pip install zstandard)."
+        ) from None
+    return zstandard.open(path, mode, **kwargs)
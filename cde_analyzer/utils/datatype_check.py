@@ -1,11 +1,29 @@
+import re
 from typing import Tuple, Union
 
 
+# The grammar int() and float() accept for strings (PEP 515 underscores,
+# Unicode digits and surrounding whitespace included), so strings can be
+# classified without raising and catching ValueError on every non-number.
+_DIGITS = r"\d(?:_?\d)*"
+_INT_RE = re.compile(rf"\s*[+-]?{_DIGITS}\s*")
+_FLOAT_RE = re.compile(
+    rf"\s*[+-]?(?:(?:{_DIGITS}\.(?:{_DIGITS})?|\.{_DIGITS}|{_DIGITS})(?:[eE][+-]?{_DIGITS})?"
+    r"|inf(?:inity)?|nan)\s*",
+    re.IGNORECASE,
+)
+# Longer integer strings may not survive the float round trip.
+_EXACT_INT_DIGITS = 15
+
+
 def check_number_type(s) -> Tuple[bool, Union[None, bool]]:
     """
     Determines if a string is number-like (integer, float as decimal, or scientific notation).
     If number-like, it also indicates whether it represents an integer.
 
+    Strings are matched against precompiled int/float grammars instead of
+    being parsed with float()/int() in try/except; the results are the same.
+
     Args:
         s (str): The input string to check.
 
@@ -14,6 +32,22 @@ def check_number_type(s) -> Tuple[bool, Union[None, bool]]:
             - bool: True if the string is number-like, False otherwise.
             - bool or None: True if it's an integer, False if it's a float, None if not number-like.
     """
+    if isinstance(s, str):
+        if _INT_RE.fullmatch(s):
+            if len(s) <= _EXACT_INT_DIGITS:
+                return True, True
+            return _parse_number_type(s)
+        if _FLOAT_RE.fullmatch(s):
+            return True, False
+        return False, None
+    if isinstance(s, int):  # bool included
+        return True, True
+    if isinstance(s, float):
+        return True, s.is_integer()
+    return _parse_number_type(s)
+
+
+def _parse_number_type(s) -> Tuple[bool, Union[None, bool]]:
     try:
         f_val = float(s)
         is_number_like = True
@@ -22,10 +56,10 @@ def check_number_type(s) -> Tuple[bool, Union[None, bool]]:
         try:
             i_val = int(s)
             is_integer = f_val == i_val
-        except ValueError:
+        except (ValueError, OverflowError):
             is_integer = False  # Not directly convertible to int, so it's a float
 
-    except ValueError:
+    except (ValueError, TypeError):
         is_number_like = False
         is_integer = None
 
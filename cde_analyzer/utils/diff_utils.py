@@ -1,6 +1,4 @@
 from difflib import unified_diff
-from rich.console import Console
-from rich.syntax import Syntax
 
 
 def print_json_diff(
@@ -46,6 +44,9 @@ def print_json_diff(
         print(f"\nSummary: +{adds} additions, -{subs} deletions\n")
 
     if color:
+        from rich.console import Console
+        from rich.syntax import Syntax
+
         console = Console()
         syntax = Syntax("\n".join(diff), "diff", theme="ansi_dark", line_numbers=False)
         console.print(syntax)
@@ -5,6 +5,7 @@ from typing import Any, Dict, List
 import csv
 import json
 import logging
+from utils.output_writer import open_output
 
 
 def safe_nested_increment(d: Dict[str, Any], *keys: str, v: int = 1):
@@ -23,6 +24,32 @@ def safe_nested_increment(d: Dict[str, Any], *keys: str, v: int = 1):
     current[last_key] = current.get(last_key, 0) + v
 
 
+def merge_nested_counts(d: Dict[str, Any], other: Dict[str, Any], sign: int = 1) -> Dict[str, Any]:
+    """
+    Add the counts of nested dict `other` into `d` (as safe_nested_increment
+    would for each of its leaves) and return `d`; with sign=-1, subtract them.
+    The merge is associative, so partial counts over shards of the input can
+    be combined in any grouping; merging them in input order also keeps the
+    key order of a single pass. Counts that reach zero and emptied dicts are
+    removed, so subtracting an item's counts undoes adding them.
+    """
+    for key, value in other.items():
+        if isinstance(value, dict):
+            current = d.get(key)
+            if not isinstance(current, dict):
+                current = d[key] = {}
+            merge_nested_counts(current, value, sign)
+            if not current:
+                del d[key]
+        else:
+            total = d.get(key, 0) + sign * value
+            if total:
+                d[key] = total
+            else:
+                d.pop(key, None)
+    return d
+
+
 def flatten_nested_dict(d: Dict[str, Any], prefix: str = "") -> Dict[str, int]:
     """
     Flattens a nested dictionary to a flat dict with joined keys.
@@ -38,8 +65,24 @@ def flatten_nested_dict(d: Dict[str, Any], prefix: str = "") -> Dict[str, int]:
     return flat
 
 
+def iter_count_records(d: Dict[str, Any], levels: List[str], _keys=()):
+    """
+    Yield one flat record per count in a nested count result, naming the key
+    levels, e.g. {"field": f, "datatype": t, "group": g, "count": n}.
+    """
+    for k, v in d.items():
+        keys = _keys + (k,)
+        if isinstance(v, dict):
+            yield from iter_count_records(v, levels, keys)
+        else:
+            names = levels + [f"level_{i}" for i in range(len(levels), len(keys))]
+            record: Dict[str, Any] = dict(zip(names, keys))
+            record["count"] = v
+            yield record
+
+
 def export_results_csv(results: Dict[str, Any], output_path: str, group_by_field: str):
-    with open(output_path, "w", encoding="utf-8", newline="") as f:
+    with open_output(output_path) as f:
         writer = csv.writer(f)
         writer.writerow(["field", "datatype", f"groupby_{group_by_field}", "count"])
         for field, type_dict in results.items():
@@ -51,7 +94,7 @@ def export_results_csv(results: Dict[str, Any], output_path: str, group_by_field
 
 
 def export_results_tsv(results: Dict[str, Any], output_path: str, group_by_field: str):
-    with open(output_path, "w", encoding="utf-8", newline="") as f:
+    with open_output(output_path) as f:
         writer = csv.writer(f, delimiter="\t")
         writer.writerow(["field", "datatype", f"groupby_{group_by_field}", "count"])
         for field, type_dict in results.items():
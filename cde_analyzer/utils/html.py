@@ -6,7 +6,6 @@ import warnings
 import logging
 import re
 import json
-from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning  # type: ignore
 from pydantic import BaseModel
 from typing import Any, Type, List, Optional, Dict, Union
 from utils.logger import log_if_verbose
@@ -17,6 +16,14 @@ logger = logging.getLogger("cde_analyzer.strip")
 verbosity = get_verbosity()
 
 
+def _beautiful_soup():
+    """BeautifulSoup, imported on first use so loading this module stays cheap."""
+    from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning  # type: ignore
+
+    warnings.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
+    return BeautifulSoup
+
+
 def normalize_string(text: str) -> str:
     # Original has .lower() but we want to maintain case
     # return unicodedata.normalize("NFC", text).strip().lower()
@@ -30,8 +37,7 @@ def strip_html(text: str) -> str:
     if text is None:
         return None
     #    print(f"stripping html: {text}")
-    warnings.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
-    soup = BeautifulSoup(text, "html.parser")
+    soup = _beautiful_soup()(text, "html.parser")
     mtext = soup.get_text(separator=" ")
     mtext = normalize_string(mtext)
     return mtext
@@ -80,8 +86,7 @@ def process_html_blob(html_string, header_col: bool):
         or a simple string containing the extracted text.
     """
 
-    warnings.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
-    soup = BeautifulSoup(html_string, "lxml")  # Use lxml parser
+    soup = _beautiful_soup()(html_string, "lxml")  # Use lxml parser
 
     # Check if the HTML contains any table tags
     table_tags = soup.find_all("table")
@@ -0,0 +1,69 @@
+##
+# utils/json_backend.py
+#
+# JSON encoding/decoding used by the loaders and writers. orjson is preferred
+# when installed (pip install orjson); the stdlib json module is the fallback.
+# The backend is chosen once per run with the global --json-backend flag.
+#
+# Output differences with orjson, all of which decode to the same values:
+#   - non-ASCII text is written as UTF-8 rather than \uXXXX escapes;
+#   - compact output has no spaces after `,` and `:`;
+#   - floats use the shortest round-trip form (1e-5 rather than 1e-05).
+# Values orjson cannot handle (non-string dict keys, integers beyond 64 bits,
+# NaN/Infinity, indents other than 2) fall back to the stdlib for that call.
+
+import json
+from typing import Any, Optional, TextIO, Union
+
+try:
+    import orjson  # type: ignore
+except ImportError:  # optional dependency
+    orjson = None
+
+JSON_BACKENDS = ("auto", "orjson", "json")
+
+_backend = "orjson" if orjson is not None else "json"
+
+
+def set_json_backend(name: str):
+    """Select `orjson`, `json`, or `auto` (orjson if installed)."""
+    global _backend
+    if name == "auto":
+        name = "orjson" if orjson is not None else "json"
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"Unknown JSON backend: {name}")
+    if name == "orjson" and orjson is None:
+        raise ImportError("--json-backend orjson needs the orjson package (pip install orjson).")
+    _backend = name
+
+
+def get_json_backend() -> str:
+    return _backend
+
+
+def dumps(obj: Any, indent: Optional[int] = None, ensure_ascii: bool = True) -> str:
+    """Serialize like `json.dumps(obj, indent=indent, ensure_ascii=ensure_ascii)`."""
+    if _backend == "orjson" and indent in (None, 2):
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+        except TypeError:  # orjson.JSONEncodeError
+            pass
+    return json.dumps(obj, indent=indent, ensure_ascii=ensure_ascii)
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Parse a str or bytes document."""
+    if _backend == "orjson":
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # NaN/Infinity or a huge integer: let the stdlib decide
+    return json.loads(data)
+
+
+def load(fp: TextIO) -> Any:
+    return loads(fp.read())
+
+
+def dump(obj: Any, fp: TextIO, indent: Optional[int] = None, ensure_ascii: bool = True):
+    fp.write(dumps(obj, indent=indent, ensure_ascii=ensure_ascii))
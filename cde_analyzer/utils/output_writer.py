@@ -1,16 +1,74 @@
 # ------------------------------
 # File: utils/output_writer.py
 # ------------------------------
+import os
+import sys
 import yaml  # pip install pyyaml
 import csv
-import json
-from typing import Any, Dict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO, Union
 from pathlib import Path
+from utils.compression import open_file, strip_compression_suffix
+from utils import json_backend
+
+
+def is_stdout(out_path: Optional[Union[str, Path]]) -> bool:
+    return out_path is None or str(out_path) == "-"
+
+
+@contextmanager
+def open_output(out_path: Optional[Union[str, Path]], mode: str = "w") -> Iterator[TextIO]:
+    """
+    Open `out_path` for writing text; None or `-` writes to standard output.
+    A .gz/.bz2/.xz/.zst suffix compresses the stream as it is written.
+
+    Items are often validated as they are written, so the file is written
+    under a temporary name and only renamed to `out_path` once the block
+    completes: an error leaves no truncated output (and an existing file
+    untouched). Append mode ("a") and existing non-regular files such as
+    /dev/null or a named pipe are written to directly.
+    """
+    if is_stdout(out_path):
+        yield sys.stdout
+        sys.stdout.flush()
+        return
+    path = Path(out_path)  # type: ignore[arg-type]
+    if "a" in mode or (path.exists() and not path.is_file()):
+        with open_file(path, mode) as f:
+            yield f
+        return
+    # keep the suffix, which selects the compression
+    tmp = path.with_name(f"{path.stem}.{os.getpid()}.tmp{path.suffix}")
+    try:
+        with open_file(tmp, mode) as f:
+            yield f
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def infer_item_format(fmt: Optional[str], out_path: Optional[Union[str, Path]]) -> str:
+    """Explicit `fmt` wins; otherwise use the extension, defaulting to json."""
+    if fmt:
+        return fmt
+    suffix = strip_compression_suffix(str(out_path)).lower().rsplit(".", 1)[-1]
+    if suffix in {"jsonl", "ndjson"}:
+        return "jsonl"
+    return suffix if suffix in {"csv", "tsv"} else "json"
+
+
+def phrase_records(data) -> Iterator[Dict[str, Any]]:
+    for path, phrases in data.items():
+        for phrase, tids in phrases.items():
+            yield {"path": path, "phrase": phrase, "tinyIds": tids}
 
 
 def phrase_write_output(data, format="json", out_path=None):
+    if format == "jsonl":
+        write_jsonl(phrase_records(data), out_path)
+        return
     if format == "json":
-        output = json.dumps(data, indent=2)
+        output = json_backend.dumps(data, indent=2)
     elif format in {"csv", "tsv"}:
         sep = "," if format == "csv" else "\t"
         lines = []
@@ -24,27 +82,123 @@ def phrase_write_output(data, format="json", out_path=None):
         raise ValueError("Unsupported output format")
 
     if out_path:
-        with open(out_path, "w", encoding="utf-8", newline="") as f:
+        with open_output(out_path) as f:
             f.write(output)
     else:
         print(output)
 
 
+def write_jsonl(
+    items: Iterable[Any],
+    out_path: Optional[Union[str, Path]],
+    append: bool = False,
+    ensure_ascii: bool = True,
+) -> int:
+    """
+    Write one compact JSON value per line (JSON Lines). With `append`, lines are
+    added to an existing file, so outputs can be built up incrementally.
+    Returns the number of items written.
+    """
+    n = 0
+    with open_output(out_path, "a" if append else "w") as f:
+        for item in items:
+            f.write(json_backend.dumps(item, ensure_ascii=ensure_ascii))
+            f.write("\n")
+            n += 1
+    return n
+
+
+def write_json_array(
+    items: Iterable[Any],
+    out_path: Optional[Union[str, Path]],
+    indent: Optional[int] = 2,
+    ensure_ascii: bool = True,
+) -> int:
+    """
+    Write items as a JSON array one element at a time (to stdout if no path).
+
+    Produces the same text as `json_backend.dumps(list(items), indent=indent)`
+    without holding the list or the full serialized string in memory.
+    Returns the number of items written.
+    """
+    if indent is None:
+        sep = ", " if json_backend.get_json_backend() == "json" else ","
+        pad, start, end = "", "[", "]"
+    else:
+        pad = " " * indent
+        start, sep, end = "[\n", ",\n", "\n]"
+    n = 0
+    with open_output(out_path) as f:
+        for item in items:
+            text = json_backend.dumps(item, indent=indent, ensure_ascii=ensure_ascii)
+            if indent is not None:
+                text = text.replace("\n", "\n" + pad)
+            f.write((start if n == 0 else sep) + pad + text)
+            n += 1
+        f.write(end if n else "[]")
+        if is_stdout(out_path):
+            f.write("\n")
+    return n
+
+
+def write_csv_rows(
+    rows: Iterable[Dict[str, Any]],
+    out_path: Optional[Union[str, Path]],
+    delimiter: str = ",",
+) -> int:
+    """Stream flat dict rows as CSV/TSV; the header comes from the first row."""
+    n = 0
+    with open_output(out_path) as f:
+        writer = None
+        for row in rows:
+            if writer is None:
+                writer = csv.DictWriter(f, fieldnames=row.keys(), delimiter=delimiter)
+                writer.writeheader()
+            writer.writerow(row)
+            n += 1
+    return n
+
+
+def write_items(
+    items: Iterable[Any],
+    out_path: Optional[Union[str, Path]],
+    fmt: Optional[str] = None,
+    indent: Optional[int] = 2,
+) -> int:
+    """Stream items as a JSON array, JSON Lines (`jsonl`) or `csv`/`tsv` rows."""
+    fmt = infer_item_format(fmt, out_path)
+    if fmt == "jsonl":
+        return write_jsonl(items, out_path)
+    if fmt in {"csv", "tsv"}:
+        return write_csv_rows(items, out_path, "," if fmt == "csv" else "\t")
+    return write_json_array(items, out_path, indent=indent)
+
+
 def save_data(data: Any, output_path: Path, fmt: str, pretty: bool):
-    output_path.parent.mkdir(parents=True, exist_ok=True)
+    """
+    Save cleaned items. `json` and `jsonl` stream `data` (any iterable);
+    `yaml` and `csv` need the full list.
+    """
+    if not is_stdout(output_path):
+        output_path.parent.mkdir(parents=True, exist_ok=True)
 
     if fmt == "json":
-        with output_path.open("w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2 if pretty else None, ensure_ascii=False)
+        write_json_array(
+            data, output_path, indent=2 if pretty else None, ensure_ascii=False
+        )
+
+    elif fmt == "jsonl":
+        write_jsonl(data, output_path, ensure_ascii=False)
 
     elif fmt == "yaml":
-        with output_path.open("w", encoding="utf-8") as f:
-            yaml.dump(data, f, allow_unicode=True, default_flow_style=False)
+        with open_output(output_path) as f:
+            yaml.dump(list(data), f, allow_unicode=True, default_flow_style=False)
 
     elif fmt == "csv":
-        if isinstance(data, list) and all(isinstance(row, dict) for row in data):
+        data = list(data)
+        if all(isinstance(row, dict) for row in data):
             fieldnames = sorted(set().union(*(row.keys() for row in data)))
-            with output_path.open("w", encoding="utf-8", newline="") as f:
+            with open_output(output_path) as f:
                 writer = csv.DictWriter(f, fieldnames=fieldnames)
                 writer.writeheader()
                 writer.writerows(data)
@@ -0,0 +1,83 @@
+# ------------------------------
+# File: utils/parallel.py
+# ------------------------------
+import time
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Chunk sizing: aim for chunks that take roughly TARGET_CHUNK_SECONDS of work,
+# long enough to amortize pickling/IPC and short enough to balance the pool.
+TARGET_CHUNK_SECONDS = 0.2
+MIN_CHUNK = 8
+MAX_CHUNK = 4096
+PROBE_ITEMS = 32
+
+
+def chunked(iterable: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Yield successive lists of at most `size` items."""
+    it = iter(iterable)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def tune_chunk_size(seconds: float, n_items: int) -> int:
+    """Chunk size giving about TARGET_CHUNK_SECONDS of work per chunk."""
+    if n_items == 0 or seconds <= 0:
+        return MAX_CHUNK
+    per_item = seconds / n_items
+    return max(MIN_CHUNK, min(MAX_CHUNK, int(TARGET_CHUNK_SECONDS / per_item)))
+
+
+def imap_chunks(
+    func: Callable[[List[Any]], List[Any]],
+    iterable: Iterable[Any],
+    workers: int = 1,
+    chunk_size: Optional[int] = None,
+    initializer: Optional[Callable[..., None]] = None,
+    initargs: Tuple[Any, ...] = (),
+) -> Iterator[Any]:
+    """
+    Apply `func` (list in, list out) to chunks of `iterable` in a process pool
+    and yield the flattened results in input order.
+
+    `func` must be picklable (a module-level function or a functools.partial of
+    one). At most 2 * workers chunks are in flight, so the input is consumed
+    lazily. Without an explicit `chunk_size`, the first PROBE_ITEMS items are
+    processed in this process and timed to choose one. `initializer(*initargs)`
+    runs once in each worker process, e.g. to hand over state this process
+    has built up.
+    """
+    it = iter(iterable)
+    if workers <= 1:
+        for chunk in chunked(it, chunk_size or 1):
+            yield from func(chunk)
+        return
+
+    if chunk_size is None:
+        probe = list(islice(it, PROBE_ITEMS))
+        start = time.perf_counter()
+        results = func(probe)
+        chunk_size = tune_chunk_size(time.perf_counter() - start, len(probe))
+        logger.info(f"Auto-tuned chunk size: {chunk_size} items ({workers} workers)")
+        yield from results
+        if len(probe) < PROBE_ITEMS:
+            return
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=initializer, initargs=initargs
+    ) as pool:
+        pending: deque = deque()
+        for chunk in chunked(it, chunk_size):
+            pending.append(pool.submit(func, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
@@ -1,10 +1,10 @@
 # File: utils/path_utils.py
 
 import csv
-import json
 import logging
 from typing import Any, Dict, List, Union
 from collections import defaultdict
+from utils import json_backend
 
 
 def load_path_schema(path: str) -> Dict[str, str]:
@@ -14,7 +14,7 @@ def load_path_schema(path: str) -> Dict[str, str]:
     """
     if path.endswith(".json"):
         with open(path, encoding="utf-8") as f:
-            return json.load(f)
+            return json_backend.load(f)
 
     schema = {}
     with open(path, encoding="utf-8") as f:
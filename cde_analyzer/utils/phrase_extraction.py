@@ -1,59 +1,375 @@
-import nltk
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-from nltk.corpus import stopwords
-from nltk.tag import pos_tag
-from nltk import word_tokenize, pos_tag
-from nltk.corpus import wordnet
-from collections import defaultdict
-from typing import Any, Dict, List, Set, Optional, DefaultDict, Tuple, Union, TypeAlias
+import io
+import os
+import hashlib
+import logging
+from array import array
+from collections import OrderedDict, defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Set, Optional, DefaultDict, Tuple, Union, TypeAlias
 from utils.logger import log_if_verbose
+from utils import json_backend
 
-# Download resources quietly
-nltk.download("punkt", quiet=True)
-nltk.download("punkt_tab", quiet=True)
-nltk.download("wordnet", quiet=True)
-nltk.download("stopwords", quiet=True)
-nltk.download("averaged_perceptron_tagger_eng", quiet=True)
-nltk.download("omw-1.4", quiet=True)
+logger = logging.getLogger(__name__)
+
+# NLTK is imported, and its data checked, on first use rather than at import:
+# loading it costs a few hundred ms and nltk.download needs the network.
+# (data path, nltk.download package) needed by each feature
+NLTK_RESOURCES: Dict[str, List[Tuple[str, str]]] = {
+    "tokenize": [("tokenizers/punkt_tab", "punkt_tab")],
+    "stopwords": [("corpora/stopwords", "stopwords")],
+    "lemmatize": [
+        ("taggers/averaged_perceptron_tagger_eng", "averaged_perceptron_tagger_eng"),
+        ("corpora/wordnet", "wordnet"),
+    ],
+}
+_verified_features: Set[str] = set()
+
+
+def require_nltk(*features: str):
+    """
+    Check once per process that the NLTK data for `features` (keys of
+    NLTK_RESOURCES) is installed, downloading what is missing if possible.
+    Raises LookupError naming the packages to install when it can't be had,
+    e.g. offline.
+    """
+    features = tuple(f for f in features if f not in _verified_features)
+    if not features:
+        return
+    import nltk
+
+    missing = []
+    for feature in features:
+        for path, package in NLTK_RESOURCES[feature]:
+            try:
+                nltk.data.find(path)
+            except LookupError:
+                if not nltk.download(package, quiet=True, print_error_to=io.StringIO()):
+                    missing.append(package)
+    if missing:
+        raise LookupError(
+            f"NLTK data not installed and not downloadable: {', '.join(missing)}. "
+            f"Run `python -m nltk.downloader {' '.join(missing)}` on a machine with "
+            "network access and copy the data to a directory on NLTK_DATA."
+        )
+    _verified_features.update(features)
+
+
+@lru_cache(maxsize=None)
+def word_tokenizer() -> Callable[[str], List[str]]:
+    require_nltk("tokenize")
+    from nltk.tokenize import word_tokenize
+
+    return word_tokenize
+
+
+@lru_cache(maxsize=None)
+def sentence_tagger() -> Callable[[List[List[str]]], List[List[Tuple[str, str]]]]:
+    """pos_tag for many token lists at once."""
+    require_nltk("lemmatize")
+    from nltk.tag import pos_tag_sents
+
+    return pos_tag_sents
+
+
+@lru_cache(maxsize=None)
+def get_lemmatizer():
+    require_nltk("lemmatize")
+    from nltk.stem import WordNetLemmatizer
+
+    return WordNetLemmatizer()
+
+
+@lru_cache(maxsize=None)
+def stopword_set() -> FrozenSet[str]:
+    require_nltk("stopwords")
+    from nltk.corpus import stopwords
+
+    return frozenset(stopwords.words("english"))
+
+
+class LRUCache:
+    """A mapping of at most `maxsize` entries that drops the least recently used, counting hits."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # new entries since the last drain, when tracked (see init_word_caches)
+        self.added: Optional[List[Tuple[Any, Any]]] = None
+
+    def get(self, key: Any) -> Any:
+        """The value for `key`, or None."""
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: Any, value: Any):
+        if self.maxsize <= 0:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if self.added is not None:
+            self.added.append((key, value))
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def stats(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return f"{self.hits}/{lookups} hits ({rate:.1%}), {len(self.entries)} entries"
+
+
+# CDE definitions and designations repeat a lot (boilerplate shared by many
+# items), so phrase_words' result is cached per lower-cased text and options,
+# and the lemma per (word, WordNet POS) for the texts that do get tagged.
+DEFAULT_WORD_CACHE_SIZE = 100_000
+_PHRASE_CACHE_VERSION = 2
+words_cache = LRUCache(DEFAULT_WORD_CACHE_SIZE)
+lemma_cache = LRUCache(DEFAULT_WORD_CACHE_SIZE)
+
+
+def set_word_cache_size(maxsize: int):
+    """Bound the text and lemma caches to `maxsize` entries each (0 disables them)."""
+    global words_cache, lemma_cache
+    words_cache = LRUCache(maxsize)
+    lemma_cache = LRUCache(maxsize)
+
+
+def log_word_cache_stats():
+    log_if_verbose(f"[CACHE] phrase words: {words_cache.stats()}", 2)
+    log_if_verbose(f"[CACHE] lemmas: {lemma_cache.stats()}", 2)
+
+
+def _nltk_version() -> str:
+    import nltk
+
+    return nltk.__version__
+
+
+def _is_strs(values: Any) -> bool:
+    return isinstance(values, list) and all(isinstance(v, str) for v in values)
+
+
+def _read_word_cache(lines: Iterable[str]) -> Tuple[list, list]:
+    """
+    Parse save_word_caches' JSON Lines (after the header) back into text and
+    lemma cache entries, raising ValueError on any record of the wrong shape.
+    """
+    words, lemmas = [], []
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json_backend.loads(line)
+        if not (isinstance(record, list) and len(record) == 3):
+            raise ValueError(f"bad cache record: {line[:80]!r}")
+        kind, key, value = record
+        if (
+            kind == "words"
+            and isinstance(key, list)
+            and len(key) == 3
+            and isinstance(key[0], str)
+            and all(isinstance(flag, bool) for flag in key[1:])
+            and _is_strs(value)
+        ):
+            words.append((tuple(key), tuple(value)))
+        elif kind == "lemma" and _is_strs(key) and len(key) == 2 and isinstance(value, str):
+            lemmas.append((tuple(key), value))
+        else:
+            raise ValueError(f"bad cache record: {line[:80]!r}")
+    return words, lemmas
+
+
+def load_word_caches(path: Union[str, Path]) -> bool:
+    """
+    Fill the caches from a file written by save_word_caches. A missing file,
+    or one written by another NLTK version, is ignored.
+    """
+    path = Path(path)
+    if not path.exists():
+        return False
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            header = json_backend.loads(f.readline() or "null")
+            if not isinstance(header, dict):
+                raise ValueError("missing version header")
+            if (header.get("version"), header.get("nltk")) != (_PHRASE_CACHE_VERSION, _nltk_version()):
+                logger.info(f"Ignoring phrase cache {path} written by another version")
+                return False
+            words, lemmas = _read_word_cache(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable phrase cache {path}: {e}")
+        return False
+    add_word_cache_entries(words, lemmas)
+    logger.info(f"Loaded {len(words)} texts and {len(lemmas)} lemmas from phrase cache {path}")
+    return True
+
+
+def add_word_cache_entries(words: Iterable[Tuple[Any, Any]], lemmas: Iterable[Tuple[Any, Any]]):
+    """Put text and lemma cache entries, least recently used first, so their order is kept."""
+    for key, value in words:
+        words_cache.put(key, value)
+    for key, value in lemmas:
+        lemma_cache.put(key, value)
+
+
+def word_cache_snapshot(with_entries: bool = True) -> tuple:
+    """
+    init_word_caches arguments that give a worker process caches of this
+    process's size and, with `with_entries`, its entries, tracking the ones
+    the worker adds.
+    """
+    if not with_entries:
+        return (words_cache.maxsize,)
+    return (
+        words_cache.maxsize,
+        list(words_cache.entries.items()),
+        list(lemma_cache.entries.items()),
+        True,
+    )
+
+
+def init_word_caches(
+    maxsize: int,
+    words: Iterable[Tuple[Any, Any]] = (),
+    lemmas: Iterable[Tuple[Any, Any]] = (),
+    track: bool = False,
+):
+    """
+    Process pool initializer: fresh caches of `maxsize` holding `words` and
+    `lemmas`. With `track`, entries added afterwards are kept for
+    drain_word_cache_entries.
+    """
+    set_word_cache_size(maxsize)
+    add_word_cache_entries(words, lemmas)
+    if track:
+        words_cache.added = []
+        lemma_cache.added = []
+
+
+def drain_word_cache_entries() -> Optional[Tuple[List[Tuple[Any, Any]], List[Tuple[Any, Any]]]]:
+    """The (text, lemma) cache entries added since the last call, or None if not tracked."""
+    if words_cache.added is None:
+        return None
+    drained = (words_cache.added, lemma_cache.added or [])
+    words_cache.added = []
+    lemma_cache.added = []
+    return drained
+
+
+def save_word_caches(path: Union[str, Path]):
+    """
+    Write the caches to `path` as JSON Lines: a version header, then one
+    `["words", key, words]` or `["lemma", key, lemma]` record per entry, least
+    recently used first. `path` is replaced only once fully written.
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as f:
+            f.write(json_backend.dumps({"version": _PHRASE_CACHE_VERSION, "nltk": _nltk_version()}) + "\n")
+            for key, words in words_cache.entries.items():
+                f.write(json_backend.dumps(["words", key, words]) + "\n")
+            for key, lemma in lemma_cache.entries.items():
+                f.write(json_backend.dumps(["lemma", key, lemma]) + "\n")
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+    logger.info(f"Saved phrase cache {path}")
 
-# Global resources
-STOPWORDS = set(stopwords.words("english"))
-lemmatizer = WordNetLemmatizer()
 
 # Type alias for clarity
 PhraseMap = DefaultDict[str, DefaultDict[str, Set[str]]]
+# With an NGramIndex: field path -> phrase key -> interned members (see add_member)
+Members: TypeAlias = Union[int, array, Dict[int, None]]
+KeyedPhraseMap = DefaultDict[str, Dict[int, Members]]
 NestedDict: TypeAlias = Dict[str, Union[List, "NestedDict"]]
 
 
 def get_wordnet_pos(tag: str) -> Union[str, None]:
     """Map POS tag to format WordNetLemmatizer accepts."""
+    # wordnet.ADJ, VERB, NOUN and ADV, without loading WordNet
     if tag.startswith("J"):
-        return wordnet.ADJ
+        return "a"
     elif tag.startswith("V"):
-        return wordnet.VERB
+        return "v"
     elif tag.startswith("N"):
-        return wordnet.NOUN
+        return "n"
     elif tag.startswith("R"):
-        return wordnet.ADV
+        return "r"
     return None  # do not convert POS-less word
 
 
-def extract_phrases(
-    text: str, min_words: int, remove_stopwords: bool, lemmatize: bool, verbosity: int
-) -> List[str]:
+def lemmatize_word(word: str, wn_pos: str) -> str:
+    key = (word, wn_pos)
+    lemma = lemma_cache.get(key)
+    if lemma is None:
+        lemma = get_lemmatizer().lemmatize(word, pos=wn_pos)
+        lemma_cache.put(key, lemma)
+    return lemma
+
+
+def phrase_words(text: str, remove_stopwords: bool, lemmatize: bool) -> List[str]:
+    """Tokenize `text` into the (lemmatized, stopword-filtered) words phrases are made of."""
+    return phrase_words_many([text], remove_stopwords, lemmatize)[0]
+
+
+def phrase_words_many(
+    texts: List[str], remove_stopwords: bool, lemmatize: bool
+) -> List[List[str]]:
+    """
+    phrase_words for each of `texts`. The distinct texts not in the cache
+    are POS tagged in one pos_tag_sents call.
+    """
+    words_of: Dict[tuple, Tuple[str, ...]] = {}
+    tokens_of: Dict[tuple, List[str]] = {}  # cache misses
+    keys = [(text.lower(), remove_stopwords, lemmatize) for text in texts]
+    for key in keys:
+        if key in words_of or key in tokens_of:
+            continue
+        words = words_cache.get(key)
+        if words is None:
+            tokens_of[key] = _tokens(key[0])
+        else:
+            log_if_verbose(f"[TOKENIZE] cached: {repr(key[0])}", 3)
+            words_of[key] = words
+
+    if tokens_of:
+        to_tag = [tokens for tokens in tokens_of.values() if tokens] if lemmatize else []
+        tagged = iter(sentence_tagger()(to_tag) if to_tag else [])
+        for key, tokens in tokens_of.items():
+            pos_tags = next(tagged) if lemmatize and tokens else None
+            words = tuple(_words(tokens, pos_tags, remove_stopwords))
+            words_cache.put(key, words)
+            words_of[key] = words
+    return [list(words_of[key]) for key in keys]
+
+
+def _tokens(text: str) -> List[str]:
     log_if_verbose(f"[TOKENIZE] raw: {repr(text)}", 3)
-    tokens = word_tokenize(text.lower())
+    tokens = word_tokenizer()(text)
     log_if_verbose(f"[TOKENIZE] tokens: {tokens}", 3)
 
     # Filter out non-alphanumeric before POS tagging
     tokens = [w for w in tokens if w.isalnum()]
     if not tokens:
         log_if_verbose(f"[POS] Skipped empty token list: {repr(text)}", 3)
-        return []
+    return tokens
+
 
-    if lemmatize:
-        pos_tags = pos_tag(tokens)
+def _words(
+    tokens: List[str], pos_tags: Optional[List[Tuple[str, str]]], remove_stopwords: bool
+) -> List[str]:
+    """The phrase words for `tokens`, lemmatized when their `pos_tags` are given."""
+    if not tokens:
+        return []
+    if pos_tags is not None:
         log_if_verbose(f"[POS] tokens: {tokens}", 3)
         log_if_verbose(f"[POS] pos_tags: {pos_tags}", 3)
 
@@ -61,7 +377,7 @@ def extract_phrases(
         for word, pos in pos_tags:
             wn_pos = get_wordnet_pos(pos)
             if wn_pos:
-                lemma = lemmatizer.lemmatize(word, pos=wn_pos)
+                lemma = lemmatize_word(word, wn_pos)
             else:
                 lemma = word
             words.append(lemma)
@@ -71,15 +387,29 @@ def extract_phrases(
     log_if_verbose(f"[CLEANED] lemmas: {words}", 3)
 
     if remove_stopwords:
-        words = [w for w in words if w not in STOPWORDS]
+        stopwords = stopword_set()
+        words = [w for w in words if w not in stopwords]
         log_if_verbose(f"[CLEANED] without stopwords: {words}", 3)
 
     log_if_verbose(
         f"[POS] Just before phrase collection. length words: {len(words)}", 3
     )
+    return words
+
+
+def extract_phrases(
+    text: str,
+    min_words: int,
+    remove_stopwords: bool,
+    lemmatize: bool,
+    verbosity: int,
+    max_words: Optional[int] = None,
+) -> List[str]:
+    words = phrase_words(text, remove_stopwords, lemmatize)
+    longest = len(words) if max_words is None else min(len(words), max_words)
 
     phrases = []
-    for size in range(min_words, len(words) + 1):
+    for size in range(min_words, longest + 1):
         for i in range(len(words) - size + 1):
             phrases.append(" ".join(words[i : i + size]))
 
@@ -87,6 +417,229 @@ def extract_phrases(
     return phrases
 
 
+class Interner:
+    """Dense integer IDs for hashable values, in first-seen order, and back."""
+
+    def __init__(self):
+        self.ids: Dict[Any, int] = {}
+        self.values: List[Any] = []
+
+    def __call__(self, value: Any) -> int:
+        i = self.ids.get(value)
+        if i is None:
+            i = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+
+class NGramIndex:
+    """
+    Phrases keyed by a hash of their token IDs instead of by their text.
+
+    Words get IDs hashed from their text and each n-gram's key is computed in
+    O(1) from prefix hashes of the field's word IDs, so collecting phrases
+    builds no string or tuple per n-gram. As keys depend only on the words,
+    indexes built in different processes can be merged (see merge). A phrase's text is joined on demand from the
+    first span it was seen in. A key is two 61-bit polynomial hashes, so two
+    distinct phrases sharing one is practically impossible.
+
+    The index also interns the tinyIds and field values phrases are collected
+    from (`tiny_ids`, `sources`), so the phrase maps hold integers only.
+    """
+
+    MOD = (1 << 61) - 1
+    BASES = (1_000_003, 2_147_483_647)
+    # a span packs (field, start, size) into one int
+    _SPAN_BITS = 20
+
+    def __init__(self):
+        self.token_ids: Dict[str, int] = {}
+        self.fields: List[List[str]] = []
+        self.spans: Dict[int, int] = {}
+        self.tiny_ids = Interner()
+        self.sources = Interner()
+
+    def keys(self, words: List[str], min_words: int, max_words: Optional[int] = None) -> List[int]:
+        """Keys of the phrases extract_phrases would return for `words`, in the same order."""
+        n = len(words)
+        longest = n if max_words is None else min(n, max_words)
+        if longest < min_words:
+            return []
+        prefixes = self.prefix_hashes(words)
+        spans, bits = self.spans, self._SPAN_BITS
+        field = len(self.fields) << (2 * bits)
+        new = False
+        keys = []
+        for size in range(min_words, longest + 1):
+            size_keys = self.keys_at(prefixes, range(n - size + 1), size)
+            for i, key in enumerate(size_keys):
+                if key not in spans:
+                    spans[key] = field | i << bits | size
+                    new = True
+            keys.extend(size_keys)
+        if new:
+            self.fields.append(words)
+        return keys
+
+    def prefix_hashes(self, words: List[str]) -> Tuple[array, array]:
+        """Both polynomial hashes of every prefix of `words`, for keys_at."""
+        token_ids = self.token_ids
+        mod, (b1, b2) = self.MOD, self.BASES
+        p1, p2 = array("q", [0]), array("q", [0])
+        h1 = h2 = 0
+        for w in words:
+            t = token_ids.get(w) or self._token_id(w)
+            h1 = (h1 * b1 + t) % mod
+            h2 = (h2 * b2 + t) % mod
+            p1.append(h1)
+            p2.append(h2)
+        return p1, p2
+
+    def keys_at(
+        self, prefixes: Tuple[array, array], starts: Iterable[int], size: int
+    ) -> List[int]:
+        """Keys of the `size`-word phrases at `starts` in the words hashed by prefix_hashes."""
+        p1, p2 = prefixes
+        mod, (b1, b2) = self.MOD, self.BASES
+        pw1, pw2 = pow(b1, size, mod), pow(b2, size, mod)
+        return [
+            ((p1[i + size] - p1[i] * pw1) % mod) << 61 | (p2[i + size] - p2[i] * pw2) % mod
+            for i in starts
+        ]
+
+    def add_span(self, key: int, field: int, start: int, size: int):
+        """Record where phrase `key` is, as words `start:start + size` of fields[field]."""
+        bits = self._SPAN_BITS
+        self.spans.setdefault(key, field << (2 * bits) | start << bits | size)
+
+    def _token_id(self, word: str) -> int:
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        # non-zero, so that a leading word always changes the hash
+        token_id = self.token_ids[word] = int.from_bytes(digest, "big") % (self.MOD - 1) + 1
+        return token_id
+
+    def merge(self, other: "NGramIndex") -> Tuple[List[int], List[int]]:
+        """
+        Add the phrases of `other`, e.g. built from another shard of the items,
+        to this index. Returns the IDs in this index of `other`'s tinyIds and
+        field values, by their IDs in `other` (see merge_phrase_maps).
+        """
+        offset = len(self.fields) << (2 * self._SPAN_BITS)
+        spans = self.spans
+        spans.update(
+            {key: span + offset for key, span in other.spans.items() if key not in spans}
+        )
+        self.fields.extend(other.fields)
+        self.token_ids.update(other.token_ids)
+        return (
+            [self.tiny_ids(value) for value in other.tiny_ids.values],
+            [self.sources(value) for value in other.sources.values],
+        )
+
+    def text(self, key: int) -> str:
+        span, bits = self.spans[key], self._SPAN_BITS
+        mask = (1 << bits) - 1
+        start, size = (span >> bits) & mask, span & mask
+        return " ".join(self.fields[span >> (2 * bits)][start : start + size])
+
+
+def add_member(members: Dict[int, Members], key: int, member: int):
+    """
+    Record that phrase `key` occurs in interned tinyId `member`. Most phrases
+    occur in one item, stored as the bare int; more members go in an int
+    array. Items are collected one at a time, so a repeat is the last member;
+    repeats of a tinyId across items are dropped by members_of.
+    """
+    current = members.get(key)
+    if current is None:
+        members[key] = member
+    elif type(current) is int:
+        if current != member:
+            members[key] = array("l", (current, member))
+    elif current[-1] != member:
+        current.append(member)
+
+
+def add_distinct(members: Dict[int, Members], key: int, member: int):
+    """add_member for members that repeat out of order (verbatim field values)."""
+    current = members.get(key)
+    if current is None:
+        members[key] = member
+    elif type(current) is int:
+        if current != member:
+            members[key] = {current: None, member: None}
+    else:
+        current[member] = None
+
+
+def members_of(members: Members) -> List[int]:
+    """The distinct members recorded by add_member/add_distinct, in the order added."""
+    if type(members) is int:
+        return [members]  # type: ignore[list-item]
+    return list(dict.fromkeys(members))
+
+
+def record_phrases(
+    path: str,
+    value: str,
+    words: List[str],
+    tiny_id: int,
+    results: KeyedPhraseMap,
+    verbatim_results: Optional[KeyedPhraseMap],
+    ngrams: NGramIndex,
+    min_words: int = 2,
+    max_words: Optional[int] = None,
+    verbosity: int = 0,
+):
+    """Add the phrases of field `path`'s `value`, made of `words`, to the KeyedPhraseMaps."""
+    phrases = ngrams.keys(words, min_words, max_words)
+    log_if_verbose(f"[PHRASES] total: {len(phrases)}", 2)
+    if phrases:
+        path_results = results[path]
+        for phrase in phrases:
+            add_member(path_results, phrase, tiny_id)
+        if verbatim_results is not None:
+            path_verbatim = verbatim_results[path]
+            source = ngrams.sources(value)
+            for phrase in phrases:
+                add_distinct(path_verbatim, phrase, source)
+    # No need to use log_if_verbose here. Want to ONLY execute if logger desired
+    if verbosity >= 3:
+        log_if_verbose(f"         value: {repr(value)}")
+        log_if_verbose(f"[PHRASES] Extracted from {path}:")
+        for phrase in phrases:
+            log_if_verbose(f"  - {ngrams.text(phrase)}")
+
+
+# A matched field waiting for its words: (path, value, tinyId, lemmatize)
+PendingField: TypeAlias = Tuple[str, str, int, bool]
+
+
+def merge_phrase_maps(
+    results: KeyedPhraseMap,
+    other: KeyedPhraseMap,
+    translate: List[int],
+    add: Callable[[Dict[int, Members], int, int], None] = add_member,
+):
+    """
+    Add the members of `other`'s phrases to `results`, after those already
+    there, with `translate` mapping their IDs (see NGramIndex.merge). `add`
+    is add_member for tinyIds and add_distinct for field values.
+    """
+    for path, other_members in other.items():
+        path_results = results[path]
+        for key, members in other_members.items():
+            if type(members) is int:
+                # most phrases: one member, often in a phrase new to `results`
+                if key not in path_results:
+                    path_results[key] = translate[members]  # type: ignore[index]
+                else:
+                    add(path_results, key, translate[members])  # type: ignore[index]
+            else:
+                for member in members_of(members):
+                    add(path_results, key, translate[member])
+
+
 def collect_phrases_from_item(
     item: Any,
     field_names: Set[str],
@@ -99,11 +652,22 @@ def collect_phrases_from_item(
     verbosity: int = 0,
     lemmatize: bool = True,
     verbatim: bool = False,
+    max_words: Optional[int] = None,
+    ngrams: Optional[NGramIndex] = None,
+    pending: Optional[List[PendingField]] = None,
 ) -> Tuple[PhraseMap, PhraseMap]:
-    """Recursively walk the object and collect phrases from fields matching field_names."""
+    """
+    Recursively walk the object and collect phrases from fields matching field_names.
+
+    With `ngrams`, `results` and `verbatim_results` are KeyedPhraseMaps:
+    phrases are NGramIndex keys and `tiny_id` and field values are interned
+    (see add_member); field values are only collected into a given
+    `verbatim_results`. With `pending` as well, matched fields are appended
+    to it instead, for record_phrases once their words are known.
+    """
     if results is None:
-        results = defaultdict(lambda: defaultdict(set))
-    if verbatim_results is None:
+        results = defaultdict(dict) if ngrams is not None else defaultdict(lambda: defaultdict(set))
+    if verbatim_results is None and ngrams is None:
         verbatim_results = defaultdict(lambda: defaultdict(set))
 
     #    print("descended into collect phrases from item")
@@ -124,6 +688,9 @@ def collect_phrases_from_item(
                 remove_stopwords,
                 verbosity,
                 verbatim,
+                max_words=max_words,
+                ngrams=ngrams,
+                pending=pending,
             )
         return results, verbatim_results
     else:
@@ -135,8 +702,26 @@ def collect_phrases_from_item(
         if key in field_names and isinstance(value, str):
             log_message = f"[MATCH] {new_path}"
             log_if_verbose(log_message, 2)
+            if pending is not None:
+                pending.append((new_path, value, tiny_id, lemmatize))  # type: ignore[arg-type]
+                continue
+            if ngrams is not None:
+                words = phrase_words(value, remove_stopwords, lemmatize)
+                record_phrases(
+                    new_path,
+                    value,
+                    words,
+                    tiny_id,  # type: ignore[arg-type]
+                    results,  # type: ignore[arg-type]
+                    verbatim_results,  # type: ignore[arg-type]
+                    ngrams,
+                    min_words,
+                    max_words,
+                    verbosity,
+                )
+                continue
             phrases = extract_phrases(
-                value, min_words, remove_stopwords, lemmatize, verbosity
+                value, min_words, remove_stopwords, lemmatize, verbosity, max_words
             )
             # No need to use log_if_verbose here. Want to ONLY execute if logger desired
             if verbosity >= 3:
@@ -147,7 +732,7 @@ def collect_phrases_from_item(
 
             for phrase in phrases:
                 results[new_path][phrase].add(tiny_id)
-                verbatim_results[new_path][phrase].add(value)
+                verbatim_results[new_path][phrase].add(value)  # type: ignore[index]
 
         elif isinstance(value, list):
             for elem in value:
@@ -161,6 +746,9 @@ def collect_phrases_from_item(
                     min_words,
                     remove_stopwords,
                     verbosity,
+                    max_words=max_words,
+                    ngrams=ngrams,
+                    pending=pending,
                 )
 
         elif hasattr(value, "__dict__") or isinstance(value, dict):
@@ -174,6 +762,9 @@ def collect_phrases_from_item(
                 min_words,
                 remove_stopwords,
                 verbosity,
+                max_words=max_words,
+                ngrams=ngrams,
+                pending=pending,
             )
 
     return results, verbatim_results
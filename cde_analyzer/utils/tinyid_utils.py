@@ -1,7 +1,7 @@
 import csv
-import json
 import logging
 from typing import Any, Dict, List, Union
+from utils import json_backend
 
 
 id_columnname_mapping = {
@@ -28,7 +28,7 @@ def load_tinyids(path: str) -> List[str]:
     """
     if path.endswith(".json"):
         with open(path, encoding="utf-8") as f:
-            return json.load(f)["tinyId"]
+            return json_backend.load(f)["tinyId"]
 
     id_list = []
     with open(path, encoding="utf-8") as f: